@@ -0,0 +1,129 @@
+"""
+Database routing and connection setup.
+
+ReplicaRouter sends reads to the aliases in settings.DATABASE_REPLICAS, but only
+inside replica_reads(): the read-only requests of the browsing views
+(ReplicaReadMixin, properties.async_views), except the actions a viewset lists
+in primary_actions. Everything else reads and writes the primary ('default').
+Within a replica_reads() block, all reads go to one replica, chosen per request.
+The first write statement (pin_after_write) pins the rest of the block to the
+primary, so the request reads what it wrote. Users, tokens and sessions are
+always read from the primary.
+
+Replicas lag behind the primary, so a response cached by properties.cache right
+after a write may still show the old data; keep replication lag well under
+API_CACHE_TIMEOUT.
+
+configure_connection() applies settings.SQLITE_PRAGMAS (WAL journal, relaxed
+fsync, a larger page cache) to every new SQLite connection.
+"""
+import random
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from rest_framework.permissions import SAFE_METHODS
+
+# Apps whose rows must never be read stale (credentials, sessions)
+PRIMARY_APPS = {'auth', 'authtoken', 'sessions', 'contenttypes'}
+
+WRITE_STATEMENT = re.compile(r'\s*(INSERT|UPDATE|DELETE|REPLACE)\b', re.IGNORECASE)
+
+
+class ReadRouting:
+    """Routing state of one replica_reads() block."""
+    
+    def __init__(self):
+        self.replica = None
+        self.pinned = False
+
+
+current_routing = ContextVar('current_routing', default=None)
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextmanager
+def replica_reads():
+    """Let reads in this block go to a replica until the first write."""
+    token = current_routing.set(ReadRouting())
+    try:
+        yield
+    finally:
+        current_routing.reset(token)
+
+
+class ReplicaReadMixin:
+    """
+    Serve the view's safe (read-only) requests from the read replicas, except for
+    the viewset actions named in primary_actions, which must not read stale rows.
+    """
+    primary_actions = ()
+    
+    def dispatch(self, request, *args, **kwargs):
+        # action_map is set by ViewSetMixin.as_view() before dispatch; self.action is not yet
+        action = getattr(self, 'action_map', {}).get(request.method.lower())
+        if request.method not in SAFE_METHODS or action in self.primary_actions:
+            return super().dispatch(request, *args, **kwargs)
+        with replica_reads():
+            return super().dispatch(request, *args, **kwargs)
+
+
+def pin_after_write(execute, sql, params, many, context):
+    """connection.execute_wrapper hook: the first write of a replica_reads() block pins it to the primary."""
+    routing = current_routing.get()
+    if routing is not None and not routing.pinned and WRITE_STATEMENT.match(sql):
+        routing.pinned = True
+    return execute(sql, params, many, context)
+
+
+def configure_connection(sender, connection, **kwargs):
+    if pin_after_write not in connection.execute_wrappers:
+        connection.execute_wrappers.append(pin_after_write)
+    # journal_mode and synchronous cannot change inside a transaction
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+class ReplicaRouter:
+    def __init__(self):
+        # Routers are loaded before the first query; connections opened earlier are configured here
+        connection_created.connect(configure_connection, dispatch_uid='airbnb_clone.db')
+        for connection in connections.all(initialized_only=True):
+            configure_connection(sender=type(connection), connection=connection)
+    
+    def db_for_read(self, model, **hints):
+        routing = current_routing.get()
+        if model._meta.app_label in PRIMARY_APPS or (routing is not None and routing.pinned):
+            return DEFAULT_DB_ALIAS
+        replicas = get_replicas()
+        if routing is None or not replicas:
+            return None
+        if routing.replica is None:
+            routing.replica = random.choice(replicas)
+        return routing.replica
+    
+    def db_for_write(self, model, **hints):
+        # Explicitly, or Django would write an instance back to the replica it was read from.
+        # Not a write yet: Django also asks when assigning related objects.
+        return DEFAULT_DB_ALIAS
+    
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+    
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary
+        if db in get_replicas():
+            return False
+        return None
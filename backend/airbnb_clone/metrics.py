@@ -0,0 +1,140 @@
+"""
+In-process request metrics in the Prometheus text exposition format.
+
+PerformanceMiddleware records every request here and /metrics renders the
+registry. Values live in the memory of each worker process, so with several
+workers every process has to be scraped (or requests pinned) separately.
+Collectors added with add_collector() report values kept elsewhere (e.g. the
+background job counters in the database) on every scrape.
+"""
+import threading
+from bisect import bisect_left
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+# Upper bounds (seconds) of the request duration histogram
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.collectors = []
+        self.reset()
+    
+    def add_collector(self, collector):
+        """
+        Render collector() on every scrape. It returns (name, type, help, samples) tuples,
+        samples being (labels, value) pairs.
+        """
+        if collector not in self.collectors:
+            self.collectors.append(collector)
+    
+    def reset(self):
+        with self.lock:
+            self.requests = {}
+            self.views = {}
+    
+    def record(self, view, method, status, duration, queries, db_time, serialize_time, render_time, response_bytes,
+               duplicates):
+        status_class = f'{status // 100}xx'
+        bucket = bisect_left(DURATION_BUCKETS, duration)
+        with self.lock:
+            key = (view, method, status_class)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            
+            stats = self.views.get((view, method))
+            if stats is None:
+                stats = self.views[(view, method)] = {
+                    'buckets': [0] * (len(DURATION_BUCKETS) + 1),
+                    'count': 0,
+                    'duration': 0.0,
+                    'queries': 0,
+                    'db_time': 0.0,
+                    'serialize_time': 0.0,
+                    'render_time': 0.0,
+                    'response_bytes': 0,
+                    'duplicates': 0,
+                }
+            stats['buckets'][bucket] += 1
+            stats['count'] += 1
+            stats['duration'] += duration
+            stats['queries'] += queries
+            stats['db_time'] += db_time
+            stats['serialize_time'] += serialize_time
+            stats['render_time'] += render_time
+            stats['response_bytes'] += response_bytes
+            stats['duplicates'] += duplicates
+    
+    def render(self):
+        with self.lock:
+            requests = sorted(self.requests.items())
+            views = sorted((key, dict(stats, buckets=list(stats['buckets']))) for key, stats in self.views.items())
+        
+        lines = [
+            '# HELP http_requests_total Requests handled, by view, method and status class.',
+            '# TYPE http_requests_total counter',
+        ]
+        for (view, method, status_class), count in requests:
+            lines.append(f'http_requests_total{_labels(view=view, method=method, status=status_class)} {count}')
+        
+        lines += [
+            '# HELP http_request_duration_seconds Wall time spent handling requests.',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        for (view, method), stats in views:
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS + ('+Inf',), stats['buckets']):
+                cumulative += count
+                lines.append(
+                    f'http_request_duration_seconds_bucket{_labels(view=view, method=method, le=bound)} {cumulative}'
+                )
+            lines.append(f'http_request_duration_seconds_sum{_labels(view=view, method=method)} {stats["duration"]:.6f}')
+            lines.append(f'http_request_duration_seconds_count{_labels(view=view, method=method)} {stats["count"]}')
+        
+        totals = [
+            ('http_request_db_queries_total', 'counter', 'Database queries run while handling requests.',
+             'queries', '{}'),
+            ('http_request_db_duration_seconds_total', 'counter', 'Time spent in database queries.',
+             'db_time', '{:.6f}'),
+            ('http_request_serialize_duration_seconds_total', 'counter',
+             'Time spent in serializers building response data, excluding their queries.', 'serialize_time', '{:.6f}'),
+            ('http_request_render_duration_seconds_total', 'counter', 'Time spent encoding response bodies (renderers).',
+             'render_time', '{:.6f}'),
+            ('http_response_size_bytes_total', 'counter', 'Bytes of non-streaming response bodies.',
+             'response_bytes', '{}'),
+            ('http_request_duplicate_queries_total', 'counter',
+             'Requests that repeated one SQL statement past the N+1 threshold.', 'duplicates', '{}'),
+        ]
+        for name, kind, description, field, value_format in totals:
+            lines += [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+            for (view, method), stats in views:
+                lines.append(f'{name}{_labels(view=view, method=method)} {value_format.format(stats[field])}')
+        
+        for collector in self.collectors:
+            for name, kind, description, samples in collector():
+                lines += [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+                for labels, value in samples:
+                    value = f'{value:.6f}' if isinstance(value, float) else value
+                    lines.append(f'{name}{_labels(**labels)} {value}')
+        
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+registry = MetricsRegistry()
+
+
+def metrics_view(request):
+    allowed_ips = getattr(settings, 'METRICS_ALLOWED_IPS', None)
+    if allowed_ips is not None and request.META.get('REMOTE_ADDR') not in allowed_ips:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
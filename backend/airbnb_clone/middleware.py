@@ -0,0 +1,160 @@
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+
+from .metrics import registry
+
+logger = logging.getLogger('airbnb_clone.performance')
+
+# Recorder of the request being handled. A context variable rather than a per-request
+# execute_wrapper, because async views run their queries on sync_to_async threads
+# (which inherit the context) rather than on the thread that started the request.
+current_recorder = ContextVar('current_recorder', default=None)
+# The request's timing stats (request._performance), for airbnb_clone.serializers
+current_timings = ContextVar('current_timings', default=None)
+
+
+class QueryRecorder:
+    """Counts queries, their time, repeated statements and the databases used for one request."""
+    
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+        self.aliases = set()
+    
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            # Parameters are not part of sql, so an N+1 loop repeats the same string
+            self.statements[sql] += 1
+            self.aliases.add(context['connection'].alias)
+    
+    def duplicates(self, threshold):
+        return [(sql, count) for sql, count in self.statements.items() if count >= threshold]
+
+
+def record_query(execute, sql, params, many, context):
+    """connection.execute_wrapper hook installed on every connection; a no-op outside requests."""
+    recorder = current_recorder.get()
+    # SQLITE_PRAGMAS run when a connection opens; they are setup, not the request's queries
+    if recorder is None or sql.startswith('PRAGMA'):
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_query_hook(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class PerformanceMiddleware:
+    """
+    Per-request timing: wall time, database queries and time, serializer and
+    renderer time and response size, recorded per view in airbnb_clone.metrics and returned in a
+    Server-Timing header. Statements repeated PERFORMANCE_DUPLICATE_QUERY_THRESHOLD
+    times in one request are logged as likely N+1 queries.
+    
+    Works in both sync and async mode, so it does not force ASGI requests onto a thread.
+    """
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.duplicate_threshold = getattr(settings, 'PERFORMANCE_DUPLICATE_QUERY_THRESHOLD', 5)
+        self.server_timing = getattr(settings, 'PERFORMANCE_SERVER_TIMING', True)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        
+        connection_created.connect(install_query_hook, dispatch_uid='airbnb_clone.performance')
+        for connection in connections.all(initialized_only=True):
+            install_query_hook(connection)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start, recorder, tokens = self.start_request(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            self.end_request(tokens)
+        return self.finish_request(request, response, start, recorder)
+    
+    async def __acall__(self, request):
+        start, recorder, tokens = self.start_request(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.end_request(tokens)
+        return self.finish_request(request, response, start, recorder)
+    
+    def start_request(self, request):
+        # serialize_time is filled in by airbnb_clone.serializers, render_time by airbnb_clone.renderers
+        request._performance = {'serialize_time': 0.0, 'render_time': 0.0}
+        recorder = QueryRecorder()
+        tokens = current_recorder.set(recorder), current_timings.set(request._performance)
+        return time.perf_counter(), recorder, tokens
+    
+    def end_request(self, tokens):
+        recorder_token, timings_token = tokens
+        current_recorder.reset(recorder_token)
+        current_timings.reset(timings_token)
+    
+    def finish_request(self, request, response, start, recorder):
+        duration = time.perf_counter() - start
+        stats = request._performance
+        view = self.get_view_name(request)
+        response_bytes = 0 if response.streaming else len(response.content)
+        
+        duplicates = recorder.duplicates(self.duplicate_threshold)
+        for sql, count in duplicates:
+            logger.warning('Possible N+1 in %s: %d identical queries: %s', view, count, sql[:300])
+        
+        registry.record(
+            view, request.method, response.status_code, duration, recorder.count, recorder.duration,
+            stats['serialize_time'], stats['render_time'], response_bytes, 1 if duplicates else 0,
+        )
+        
+        if self.server_timing:
+            app_time = max(0.0, duration - recorder.duration - stats['serialize_time'] - stats['render_time'])
+            db_desc = f'{recorder.count} queries'
+            if recorder.aliases - {DEFAULT_DB_ALIAS}:
+                # Requests served (partly) by a read replica name the databases they used
+                db_desc += f' on {"+".join(sorted(recorder.aliases))}'
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={recorder.duration * 1000:.2f};desc="{db_desc}"',
+                f'serialize;dur={stats["serialize_time"] * 1000:.2f}',
+                f'render;dur={stats["render_time"] * 1000:.2f}',
+                f'app;dur={app_time * 1000:.2f}',
+                f'total;dur={duration * 1000:.2f}',
+            ])
+        return response
+    
+    @staticmethod
+    def get_view_name(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'unresolved'
+        view_func = match.func
+        view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+        if view_class is None:
+            return f'{view_func.__module__}.{view_func.__name__}'
+        name = view_class.__name__
+        # ViewSets map the HTTP method to an action (list, retrieve, book, ...)
+        actions = getattr(view_func, 'actions', None)
+        if actions:
+            action = actions.get(request.method.lower())
+            if action:
+                name = f'{name}.{action}'
+        return name
@@ -0,0 +1,25 @@
+import time
+
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+
+
+class TimedRendererMixin:
+    """Adds the time spent rendering to the request's PerformanceMiddleware stats."""
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        start = time.perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            request = (renderer_context or {}).get('request')
+            stats = getattr(getattr(request, '_request', None), '_performance', None)
+            if stats is not None:
+                stats['render_time'] += time.perf_counter() - start
+
+
+class TimedJSONRenderer(TimedRendererMixin, JSONRenderer):
+    pass
+
+
+class TimedBrowsableAPIRenderer(TimedRendererMixin, BrowsableAPIRenderer):
+    pass
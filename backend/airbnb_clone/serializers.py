@@ -0,0 +1,28 @@
+import time
+
+from .middleware import current_recorder, current_timings
+
+
+class TimedSerializerMixin:
+    """
+    Adds the time spent in to_representation() to the request's PerformanceMiddleware
+    stats. Only the outermost serializer is timed, so nested serializers are not
+    counted twice, and queries it triggers are left to the database time.
+    """
+    
+    def to_representation(self, instance):
+        timings = current_timings.get()
+        if timings is None or timings.get('serializing'):
+            return super().to_representation(instance)
+        recorder = current_recorder.get()
+        db_time = recorder.duration if recorder is not None else 0.0
+        timings['serializing'] = True
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            elapsed = time.perf_counter() - start
+            if recorder is not None:
+                elapsed -= recorder.duration - db_time
+            timings['serialize_time'] += elapsed
+            timings['serializing'] = False
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Property, PropertyImage, Review, Booking
+from .models import Property, PropertyImage, Review, Booking, ScheduledJob
 
 
 @admin.register(Property)
@@ -8,7 +8,7 @@ class PropertyAdmin(admin.ModelAdmin):
     list_filter = ['property_type', 'room_type', 'is_available', 'is_featured', 'city', 'state', 'country']
     search_fields = ['title', 'description', 'address', 'city', 'host__username']
     list_editable = ['is_available', 'is_featured']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['average_rating', 'review_count', 'created_at', 'updated_at']
     
     fieldsets = (
         ('Basic Information', {
@@ -20,9 +20,15 @@ class PropertyAdmin(admin.ModelAdmin):
         ('Property Details', {
             'fields': ('property_type', 'room_type', 'price_per_night', 'max_guests', 'bedrooms', 'bathrooms')
         }),
+        ('Length-of-stay Discounts', {
+            'fields': ('weekly_discount', 'monthly_discount')
+        }),
         ('Features', {
             'fields': ('amenities', 'is_available', 'is_featured')
         }),
+        ('Ratings', {
+            'fields': ('average_rating', 'review_count')
+        }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
@@ -35,6 +41,7 @@ class PropertyImageAdmin(admin.ModelAdmin):
     list_display = ['property', 'caption', 'is_primary', 'created_at']
     list_filter = ['is_primary', 'created_at']
     search_fields = ['property__title', 'caption']
+    readonly_fields = ['width', 'height', 'placeholder']
 
 
 @admin.register(Review)
@@ -66,4 +73,14 @@ class BookingAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at', 'duration'),
             'classes': ('collapse',)
         }),
-    ) 
\ No newline at end of file
+    ) 
+
+
+@admin.register(ScheduledJob)
+class ScheduledJobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'enabled', 'interval', 'next_run_at', 'last_finished_at', 'last_succeeded',
+                    'run_count', 'failure_count', 'items_total']
+    list_filter = ['enabled', 'last_succeeded']
+    readonly_fields = ['name', 'locked_until', 'locked_by', 'last_started_at', 'last_finished_at', 'last_succeeded',
+                       'last_error', 'last_items', 'last_duration', 'run_count', 'failure_count', 'items_total',
+                       'duration_total']
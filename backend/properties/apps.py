@@ -3,4 +3,12 @@ from django.apps import AppConfig
 
 class PropertiesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'properties' 
\ No newline at end of file
+    name = 'properties'
+    
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from airbnb_clone.metrics import registry
+        from . import jobs, signals
+        
+        post_migrate.connect(signals.create_search_index, sender=self)
+        registry.add_collector(jobs.collect_metrics)
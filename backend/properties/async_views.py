@@ -0,0 +1,130 @@
+"""
+Async read path for property browsing, under /api/async/properties/.
+
+The same list, featured, search and detail responses as the GET endpoints of
+PropertyViewSet (filters, ordering, both pagination styles, sparse fieldsets,
+the response cache and ETags), written as native async Django views. Under
+ASGI, a worker keeps serving other requests while one of them waits on the
+database or the cache, without a thread per request. DRF views are synchronous
+and would each be moved onto a thread, so these views only borrow a
+PropertyViewSet to build querysets and serializers, which does no I/O. They do
+not authenticate: every response is public. Like the sync views, they read from
+the read replicas when DATABASE_REPLICA_URLS configures any (airbnb_clone.db).
+
+On Django 4.2 the async ORM and the cache's async API still run each call
+through sync_to_async, on a thread ASGIHandler keeps for the request, so
+queries don't overlap more than they do under WSGI threads; what moves onto the
+event loop is everything between them. run_benchmarks --compare-async measures
+the difference against the WSGI deployment.
+"""
+import functools
+
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.response import Response
+
+from airbnb_clone.db import replica_reads
+from airbnb_clone.renderers import TimedJSONRenderer
+from . import cache as response_cache
+from .models import Property
+from .search import aget_backend, search_properties
+from .views import PropertyViewSet
+
+
+def async_browse_view(action):
+    """
+    Wrap an async browse view with the method check, the response cache and DRF-style
+    error bodies. The view gets a PropertyViewSet prepared for the request and returns
+    an unrendered Response.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, pk=None):
+            viewset = get_viewset(request, action, pk)
+            if request.method not in ('GET', 'HEAD'):
+                return render(viewset, Response(
+                    {'detail': f'Method "{request.method}" not allowed.'},
+                    status=status.HTTP_405_METHOD_NOT_ALLOWED, headers={'Allow': 'GET, HEAD'}
+                ))
+            
+            key = await response_cache.amake_key(viewset.request, f'async-{action}', pk)
+            entry = await response_cache.aget(key)
+            if entry is None:
+                try:
+                    with replica_reads():
+                        response = await view(viewset, pk)
+                except APIException as exc:
+                    detail = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+                    response = Response(detail, status=exc.status_code)
+                if response.status_code != status.HTTP_200_OK:
+                    return render(viewset, response)
+                entry = await response_cache.astore(key, render(viewset, response))
+            return response_cache.to_response(request, entry)
+        return wrapper
+    return decorator
+
+
+def get_viewset(request, action, pk=None):
+    viewset = PropertyViewSet(
+        action_map={'get': action, 'head': action}, args=(), kwargs={'pk': pk} if pk is not None else {},
+        format_kwarg=None,
+    )
+    viewset.request = viewset.initialize_request(request)
+    viewset.action = action
+    # JSON only; content negotiation would offer the browsable API
+    viewset.request.accepted_renderer = TimedJSONRenderer()
+    viewset.request.accepted_media_type = TimedJSONRenderer.media_type
+    return viewset
+
+
+def render(viewset, response):
+    renderer = viewset.request.accepted_renderer
+    content = renderer.render(response.data, renderer.media_type, {'request': viewset.request})
+    rendered = HttpResponse(content, content_type=renderer.media_type, status=response.status_code)
+    for name, value in response.items():
+        if name.lower() != 'content-type':
+            rendered[name] = value
+    return rendered
+
+
+async def paginate(viewset, queryset):
+    paginator = viewset.paginator
+    page = await paginator.apaginate_queryset(queryset, viewset.request, view=viewset)
+    if page is None:
+        return Response(viewset.get_serializer([row async for row in queryset], many=True).data)
+    return paginator.get_paginated_response(viewset.get_serializer(page, many=True).data)
+
+
+@async_browse_view('list')
+async def property_list(viewset, pk=None):
+    # ?search= goes through properties.search, whose backend check may need a query
+    await aget_backend(Property.objects.db)
+    return await paginate(viewset, viewset.filter_queryset(viewset.get_queryset()))
+
+
+@async_browse_view('retrieve')
+async def property_detail(viewset, pk=None):
+    try:
+        property_obj = await viewset.filter_queryset(viewset.get_queryset()).aget(pk=pk)
+    except Property.DoesNotExist:
+        raise NotFound()
+    return Response(viewset.get_serializer(property_obj).data)
+
+
+@async_browse_view('featured')
+async def featured(viewset, pk=None):
+    queryset = viewset.get_base_queryset().filter(is_featured=True, is_available=True)
+    return Response(viewset.get_serializer([row async for row in queryset], many=True).data)
+
+
+@async_browse_view('search')
+async def search(viewset, pk=None):
+    query = viewset.request.query_params.get('q', '')
+    if not query:
+        return Response({'error': 'Search query is required'}, status=status.HTTP_400_BAD_REQUEST)
+    await aget_backend(Property.objects.db)
+    properties = search_properties(
+        viewset.get_base_queryset().filter(is_available=True), query
+    ).order_by('-search_rank', '-created_at')
+    return await paginate(viewset, properties)
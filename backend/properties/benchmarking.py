@@ -0,0 +1,275 @@
+import asyncio
+import http.client
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.db import connections
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Latency summary (milliseconds) for a list of samples."""
+    return {
+        'runs': len(samples),
+        'mean_ms': statistics.fmean(samples) if samples else 0.0,
+        'min_ms': min(samples, default=0.0),
+        'p50_ms': percentile(samples, 50),
+        'p95_ms': percentile(samples, 95),
+        'p99_ms': percentile(samples, 99),
+    }
+
+
+def measure(fn, repeat=20, warmup=2):
+    """Call fn() repeatedly and return summarize() of the wall times."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def format_stats(label, stats, width=48):
+    return (
+        f"{label:<{width}} p50 {stats['p50_ms']:8.2f} ms  "
+        f"p95 {stats['p95_ms']:8.2f} ms  min {stats['min_ms']:8.2f} ms"
+    )
+
+
+class ClientTransport:
+    """Requests through Django's test client, in this process (one client per thread)."""
+    name = 'client'
+    
+    def __init__(self):
+        self.local = threading.local()
+    
+    def start(self):
+        return self
+    
+    def stop(self):
+        pass
+    
+    def request(self, method, path, body=None, headers=None):
+        from rest_framework.test import APIClient
+        
+        if not hasattr(self.local, 'client'):
+            self.local.client = APIClient(SERVER_NAME='localhost')
+        extra = {'HTTP_' + name.upper().replace('-', '_'): value for name, value in (headers or {}).items()}
+        response = self.local.client.generic(method, path, body or '', content_type='application/json', **extra)
+        return response.status_code, response.content
+
+
+class HTTPTransport:
+    """Requests over real sockets to a server started on a free local port."""
+    name = 'http'
+    host = '127.0.0.1'
+    port = None
+    
+    def request(self, method, path, body=None, headers=None):
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        try:
+            headers = {'Host': 'localhost', 'Content-Type': 'application/json', **(headers or {})}
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            return response.status, response.read()
+        finally:
+            connection.close()
+
+
+class WSGIServerTransport(HTTPTransport):
+    """Django's threaded WSGI development server (the one runserver uses)."""
+    name = 'wsgi'
+    
+    def start(self):
+        from django.core.handlers.wsgi import WSGIHandler
+        from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+        
+        class QuietHandler(WSGIRequestHandler):
+            def log_message(self, *args):
+                pass
+        
+        self.server = ThreadedWSGIServer((self.host, 0), QuietHandler, allow_reuse_address=False)
+        self.server.set_app(WSGIHandler())
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+    
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class ASGIServerTransport(HTTPTransport):
+    """uvicorn serving Django's ASGI handler, when uvicorn is installed."""
+    name = 'asgi'
+    
+    @staticmethod
+    def available():
+        try:
+            import uvicorn  # noqa: F401
+        except ImportError:
+            return False
+        return True
+    
+    def start(self):
+        import socket
+        import uvicorn
+        from django.core.handlers.asgi import ASGIHandler
+        
+        sock = socket.socket()
+        sock.bind((self.host, 0))
+        self.port = sock.getsockname()[1]
+        config = uvicorn.Config(ASGIHandler(), log_level='warning', lifespan='off')
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, kwargs={'sockets': [sock]}, daemon=True)
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+    
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+class ASGIInProcessTransport:
+    """
+    Django's ASGI handler called directly with a hand-built scope; the fallback without
+    uvicorn. Every request runs on one event loop thread, like a single server worker.
+    """
+    name = 'asgi-inprocess'
+    
+    def start(self):
+        from django.core.handlers.asgi import ASGIHandler
+        
+        self.app = ASGIHandler()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='asgi-event-loop', daemon=True)
+        self.thread.start()
+        return self
+    
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+    
+    def request(self, method, path, body=None, headers=None):
+        return asyncio.run_coroutine_threadsafe(self.call(method, path, body, headers), self.loop).result()
+    
+    async def call(self, method, path, body, headers):
+        parsed = urlsplit(path)
+        headers = {'Host': 'localhost', 'Content-Type': 'application/json', **(headers or {})}
+        body = (body or '').encode()
+        if body:
+            headers['Content-Length'] = str(len(body))
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': parsed.path,
+            'raw_path': parsed.path.encode(),
+            'query_string': parsed.query.encode(),
+            'headers': [(name.lower().encode(), value.encode('latin1')) for name, value in headers.items()],
+            'server': ('localhost', 80),
+            'client': ('127.0.0.1', 0),
+        }
+        messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+        response = {'status': None, 'body': []}
+        
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            # Nothing more to read; the client stays connected until the response is sent
+            await asyncio.Future()
+        
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+            elif message['type'] == 'http.response.body':
+                response['body'].append(message.get('body', b''))
+        
+        await self.app(scope, receive, send)
+        return response['status'], b''.join(response['body'])
+
+
+def get_transport(name):
+    if name == 'client':
+        return ClientTransport()
+    if name == 'wsgi':
+        return WSGIServerTransport()
+    if name == 'asgi':
+        return ASGIServerTransport() if ASGIServerTransport.available() else ASGIInProcessTransport()
+    raise ValueError(f'Unknown transport {name!r}')
+
+
+def load(fn, requests, concurrency):
+    """
+    Call fn() `requests` times in total from `concurrency` threads. Returns the elapsed
+    seconds and the latency of every call in milliseconds.
+    """
+    per_thread = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+    barrier = threading.Barrier(concurrency + 1)
+    samples = []
+    
+    def worker(count):
+        barrier.wait()
+        try:
+            for _ in range(count):
+                start = time.perf_counter()
+                fn()
+                samples.append((time.perf_counter() - start) * 1000)
+        finally:
+            connections.close_all()
+    
+    threads = [threading.Thread(target=worker, args=(count,)) for count in per_thread]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, samples
+
+
+def throughput(fn, requests, concurrency):
+    """Requests per second when `concurrency` threads call fn() `requests` times in total."""
+    elapsed, _ = load(fn, requests, concurrency)
+    return requests / elapsed if elapsed else 0.0
+
+
+class ThreadSampler:
+    """Context manager recording the highest number of live threads in the process."""
+    
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.peak = 0
+        self.done = threading.Event()
+    
+    def sample(self):
+        while not self.done.wait(self.interval):
+            # Not counting the sampler thread itself
+            self.peak = max(self.peak, threading.active_count() - 1)
+    
+    def __enter__(self):
+        self.peak = threading.active_count()
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        self.thread.start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.done.set()
+        self.thread.join()
@@ -0,0 +1,151 @@
+"""
+Batch availability checks and booking creation.
+
+A batch of (property_id, check_in_date, check_out_date, guests) items is resolved
+with one query for the properties, one for the BookedNight rows of all of them
+across the batch's date span and one for their nightly rates, instead of two property lookups and an
+overlap query per item. Accepted bookings and their nights are then inserted
+with bulk_create in the same transaction, while the properties involved are
+locked, so every item gets the answer PropertyViewSet.book would have given.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from . import cache as response_cache
+from . import pricing
+from . import stats
+from .models import BookedNight, Booking, Property
+from .serializers import BulkBookingItemSerializer
+
+NOT_FOUND = 'Property not found'
+UNAVAILABLE = 'Property is not available for the selected dates'
+BATCH_CONFLICT = 'Dates overlap an earlier booking in this batch'
+
+
+def get_max_items():
+    return getattr(settings, 'BULK_BOOKING_MAX_ITEMS', 200)
+
+
+def parse_items(data):
+    """
+    Validate each item of a batch on its own.
+    
+    Returns one result dict per item, in order: {'index', 'data'} for valid items
+    and {'index', 'errors'} for the others.
+    """
+    results = []
+    for index, item in enumerate(data):
+        serializer = BulkBookingItemSerializer(data=item)
+        if serializer.is_valid():
+            results.append({'index': index, 'data': serializer.validated_data})
+        else:
+            results.append({'index': index, 'errors': serializer.errors})
+    return results
+
+
+def taken_nights(property_ids, items):
+    """Booked nights of the given properties over the whole date span of items, per property."""
+    taken = defaultdict(set)
+    if not items:
+        return taken
+    nights = BookedNight.objects.filter(
+        property_id__in=property_ids,
+        date__gte=min(item['check_in_date'] for item in items),
+        date__lt=max(item['check_out_date'] for item in items),
+    ).values_list('property_id', 'date')
+    for property_id, night in nights:
+        taken[property_id].add(night)
+    return taken
+
+
+def resolve(results, properties, claim):
+    """
+    Decide every valid item of results against the current availability.
+    
+    properties maps the ids of the batch to Property objects. With claim, the nights
+    of an accepted item count as taken for the items after it, as they will once the
+    batch is booked; otherwise every item is answered on its own. Accepted items are
+    priced together with pricing.quote_stays().
+    """
+    items = [result['data'] for result in results if 'data' in result]
+    taken = taken_nights(list(properties), items)
+    claimed = defaultdict(set)
+    for result in results:
+        if 'data' not in result:
+            continue
+        item = result['data']
+        property_obj = properties.get(item['property_id'])
+        if property_obj is None:
+            result['errors'] = {'property_id': [NOT_FOUND]}
+            continue
+        
+        nights = Booking.night_dates(item['check_in_date'], item['check_out_date'])
+        if not taken[property_obj.pk].isdisjoint(nights):
+            result['errors'] = {'non_field_errors': [UNAVAILABLE]}
+        elif not claimed[property_obj.pk].isdisjoint(nights):
+            result['errors'] = {'non_field_errors': [BATCH_CONFLICT]}
+        else:
+            if claim:
+                claimed[property_obj.pk].update(nights)
+            result['property'] = property_obj
+    
+    accepted = [result for result in results if 'property' in result]
+    totals = pricing.quote_stays(
+        [(result['property'].pk, result['data']['check_in_date'], result['data']['check_out_date'])
+         for result in accepted],
+        properties,
+    )
+    for result, total in zip(accepted, totals):
+        result['total_price'] = total
+    return results
+
+
+def check_availability(data):
+    """Per-item availability and price of a batch, without booking anything."""
+    results = parse_items(data)
+    property_ids = {result['data']['property_id'] for result in results if 'data' in result}
+    properties = Property.objects.only(*pricing.PRICING_FIELDS).in_bulk(property_ids)
+    return resolve(results, properties, claim=False)
+
+
+def create_bookings(user, data):
+    """
+    Book every available item of a batch for user in one transaction.
+    
+    Items that are invalid, unavailable or overlap an earlier item are left out and
+    keep their errors; accepted ones get 'booking'. Returns the results in order.
+    """
+    results = parse_items(data)
+    property_ids = {result['data']['property_id'] for result in results if 'data' in result}
+    with transaction.atomic():
+        resolve(results, Property.objects.lock_all(property_ids), claim=True)
+        accepted = [result for result in results if 'errors' not in result]
+        bookings = Booking.objects.bulk_create([
+            Booking(
+                property=result['property'],
+                user=user,
+                check_in_date=result['data']['check_in_date'],
+                check_out_date=result['data']['check_out_date'],
+                guests=result['data']['guests'],
+                special_requests=result['data'].get('special_requests', ''),
+                total_price=result['total_price'],
+            )
+            for result in accepted
+        ])
+        # bulk_create() skips the post_save signal that keeps the availability index
+        # up to date; the locks above mean none of these nights can be taken since
+        BookedNight.objects.bulk_create([
+            BookedNight(property_id=booking.property_id, booking=booking, date=night)
+            for booking in bookings
+            for night in Booking.night_dates(booking.check_in_date, booking.check_out_date)
+        ])
+        for result, booking in zip(accepted, bookings):
+            result['booking'] = booking
+        # Also skipped by bulk_create(): the host dashboard rollup
+        stats.refresh(stats.stats_keys(bookings))
+    
+    if bookings:
+        response_cache.bump_availability()
+    return results
@@ -0,0 +1,178 @@
+"""
+Versioned response cache for the read-only property endpoints.
+
+Entries are never deleted on writes. Instead every key embeds version counters
+that signals bump when data changes, so stale entries simply stop being read
+and age out of the backend:
+
+- catalog: any Property, PropertyImage, Review or NightlyRate change (lists, featured, search)
+- availability: any Booking change; only part of keys for ?check_in/?check_out lists
+- property:<id>: changes to that property, its images, reviews or rates (retrieve)
+- all: part of every key; bumped by bulk maintenance commands that bypass signals
+
+The backend is the Django cache alias named by settings.API_CACHE_ALIAS, so it
+can be local memory (LRU), file based, or Redis.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import quote_etag
+
+KEY_PREFIX = 'api:properties'
+CATALOG = 'catalog'
+AVAILABILITY = 'availability'
+ALL = 'all'
+
+# Query parameters that make a list depend on booking data
+AVAILABILITY_PARAMS = ('check_in', 'check_out')
+
+
+def get_cache():
+    return caches[getattr(settings, 'API_CACHE_ALIAS', 'default')]
+
+
+def _version_key(name):
+    return f'{KEY_PREFIX}:version:{name}'
+
+
+def get_versions(names):
+    """Current value of each version counter, initialising missing ones."""
+    cache = get_cache()
+    keys = {name: _version_key(name) for name in names}
+    found = cache.get_many(keys.values())
+    versions = {}
+    for name, key in keys.items():
+        if key in found:
+            versions[name] = found[key]
+        else:
+            # A counter that was evicted must not restart at a value an old entry used
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[name] = cache.get(key)
+    return versions
+
+
+async def aget_versions(names):
+    """get_versions() through the cache's async API."""
+    cache = get_cache()
+    keys = {name: _version_key(name) for name in names}
+    found = await cache.aget_many(keys.values())
+    versions = {}
+    for name, key in keys.items():
+        if key in found:
+            versions[name] = found[key]
+        else:
+            await cache.aadd(key, time.time_ns(), timeout=None)
+            versions[name] = await cache.aget(key)
+    return versions
+
+
+def bump(*names):
+    # Deferred until the writer commits: bumped inside its transaction, a concurrent reader
+    # could cache the old rows under the new version, and a rollback would bump for nothing
+    transaction.on_commit(lambda: _bump(names))
+
+
+def _bump(names):
+    cache = get_cache()
+    for name in names:
+        try:
+            cache.incr(_version_key(name))
+        except ValueError:
+            cache.set(_version_key(name), time.time_ns(), timeout=None)
+
+
+def bump_property(property_id):
+    bump(CATALOG, f'property:{property_id}')
+
+
+def bump_availability():
+    bump(AVAILABILITY)
+
+
+def bump_all():
+    bump(ALL)
+
+
+def get_version_names(request, property_id=None):
+    if property_id is not None:
+        return [ALL, f'property:{property_id}']
+    version_names = [ALL, CATALOG]
+    if any(request.query_params.get(param) for param in AVAILABILITY_PARAMS):
+        version_names.append(AVAILABILITY)
+    return version_names
+
+
+def make_key(request, scope, property_id=None):
+    version_names = get_version_names(request, property_id)
+    return build_key(request, scope, version_names, get_versions(version_names))
+
+
+async def amake_key(request, scope, property_id=None):
+    version_names = get_version_names(request, property_id)
+    return build_key(request, scope, version_names, await aget_versions(version_names))
+
+
+def build_key(request, scope, version_names, versions):
+    # Normalise the query string so parameter order and empty values don't split entries
+    params = sorted(
+        (name, value)
+        for name in request.query_params
+        for value in request.query_params.getlist(name)
+        if value != ''
+    )
+    fingerprint = repr((request.path, params, request.accepted_media_type, [versions[name] for name in version_names]))
+    digest = hashlib.sha1(fingerprint.encode()).hexdigest()
+    return f'{KEY_PREFIX}:{scope}:{digest}'
+
+
+def make_etag(content):
+    return quote_etag(hashlib.md5(content).hexdigest())
+
+
+def not_modified(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+    return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+
+
+def get(key):
+    return get_cache().get(key)
+
+
+async def aget(key):
+    return await get_cache().aget(key)
+
+
+def make_entry(response):
+    content = response.content
+    return {
+        'content': content,
+        'content_type': response['Content-Type'],
+        'status': response.status_code,
+        'etag': make_etag(content),
+    }
+
+
+def store(key, response):
+    """Cache a rendered response and return the entry."""
+    entry = make_entry(response)
+    get_cache().set(key, entry, timeout=getattr(settings, 'API_CACHE_TIMEOUT', 300))
+    return entry
+
+
+async def astore(key, response):
+    entry = make_entry(response)
+    await get_cache().aset(key, entry, timeout=getattr(settings, 'API_CACHE_TIMEOUT', 300))
+    return entry
+
+
+def to_response(request, entry):
+    if not_modified(request, entry['etag']):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(entry['content'], content_type=entry['content_type'], status=entry['status'])
+    response['ETag'] = entry['etag']
+    return response
@@ -0,0 +1,150 @@
+"""
+Streaming NDJSON and CSV exports of properties and bookings.
+
+Rows are read with values_list().iterator(chunk_size=...) (a server-side cursor
+on PostgreSQL, fetchmany() on SQLite) and encoded a chunk at a time into a
+StreamingHttpResponse, so memory stays flat however many rows match. Under ASGI
+the rows come from aiterator() instead, because Django consumes a synchronous
+iterator completely before sending any of it to an ASGI server.
+"""
+import csv
+import io
+import json
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+
+# Model lookups exported per row; columns are named with '__' replaced by '_'
+PROPERTY_FIELDS = [
+    'id', 'title', 'address', 'city', 'state', 'country', 'zip_code', 'property_type', 'room_type',
+    'price_per_night', 'weekly_discount', 'monthly_discount', 'max_guests', 'bedrooms', 'bathrooms',
+    'amenities', 'latitude', 'longitude', 'host_id', 'host__username', 'is_available', 'is_featured',
+    'average_rating', 'review_count', 'created_at', 'updated_at',
+]
+
+BOOKING_FIELDS = [
+    'id', 'property_id', 'property__title', 'property__city', 'user_id', 'user__username',
+    'check_in_date', 'check_out_date', 'guests', 'total_price', 'status', 'created_at', 'updated_at',
+]
+
+# Annotations a filtered queryset may carry that are worth exporting
+EXTRA_COLUMNS = ['distance_km', 'trip_price', 'search_rank']
+
+
+class NDJSONRenderer(JSONRenderer):
+    """
+    Declares the NDJSON export format for content negotiation (?format=ndjson or
+    Accept: application/x-ndjson). Export rows are streamed by the view; the renderer
+    only renders error responses, as a single JSON line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class CSVRenderer(JSONRenderer):
+    """Declares the CSV export format (?format=csv or Accept: text/csv); errors are rendered as JSON."""
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+def get_chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+def get_columns(queryset, fields):
+    lookups = list(fields) + [name for name in EXTRA_COLUMNS if name in queryset.query.annotations]
+    return lookups, [lookup.replace('__', '_') for lookup in lookups]
+
+
+def rows_queryset(queryset, lookups):
+    # Prefetches from the viewset's queryset don't apply to tuples (and aiterator() refuses them).
+    # named=True because Django 4.2's aiterator() runs plain values_list() queries on the event loop.
+    return queryset.prefetch_related(None).values_list(*lookups, named=True)
+
+
+class Encoder:
+    """Turns chunks of value tuples into text in one export format."""
+    
+    def __init__(self, export_format, columns):
+        self.format = export_format
+        self.columns = columns
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+    
+    def header(self):
+        if self.format != 'csv':
+            return ''
+        self.writer.writerow(self.columns)
+        return self.flush()
+    
+    def encode(self, rows):
+        if self.format == 'csv':
+            for row in rows:
+                self.writer.writerow([self.csv_value(value) for value in row])
+            return self.flush()
+        return ''.join(
+            json.dumps(dict(zip(self.columns, row)), cls=DjangoJSONEncoder, separators=(',', ':')) + '\n'
+            for row in rows
+        )
+    
+    def flush(self):
+        text = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return text
+    
+    @staticmethod
+    def csv_value(value):
+        if value is None:
+            return ''
+        if isinstance(value, (list, dict)):
+            return json.dumps(value)
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+
+def stream_rows(queryset, fields, export_format, chunk_size=None):
+    """Encoded text of every row of queryset, one chunk of rows per item."""
+    chunk_size = chunk_size or get_chunk_size()
+    lookups, columns = get_columns(queryset, fields)
+    encoder = Encoder(export_format, columns)
+    yield encoder.header()
+    chunk = []
+    for row in rows_queryset(queryset, lookups).iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield encoder.encode(chunk)
+            chunk = []
+    if chunk:
+        yield encoder.encode(chunk)
+
+
+async def astream_rows(queryset, fields, export_format, chunk_size=None):
+    """stream_rows() through the async ORM."""
+    chunk_size = chunk_size or get_chunk_size()
+    lookups, columns = get_columns(queryset, fields)
+    encoder = Encoder(export_format, columns)
+    yield encoder.header()
+    chunk = []
+    async for row in rows_queryset(queryset, lookups).aiterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield encoder.encode(chunk)
+            chunk = []
+    if chunk:
+        yield encoder.encode(chunk)
+
+
+def streaming_response(request, queryset, fields, export_format, filename):
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        content = astream_rows(queryset, fields, export_format)
+    else:
+        content = stream_rows(queryset, fields, export_format)
+    renderer = CSVRenderer if export_format == 'csv' else NDJSONRenderer
+    response = StreamingHttpResponse(content, content_type=f'{renderer.media_type}; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{renderer.format}"'
+    return response
@@ -0,0 +1,89 @@
+"""
+Facet counts for the property filter sidebar.
+
+Counts are computed in the database for whatever filtered queryset the list
+would return, without loading or serializing listings:
+
+- one conditional aggregate (a single pass) for the total, property_type,
+  room_type and price buckets
+- one GROUP BY for the most common cities
+- one GROUP BY over the amenity index (PropertyAmenity), plus the names of the
+  top amenities
+
+The facets action serves anonymous requests from the versioned response cache,
+so repeated sidebars cost no queries until the catalog changes.
+"""
+from django.conf import settings
+from django.db.models import Count, Q
+
+from .models import Amenity, Property, PropertyAmenity
+
+
+def get_price_buckets():
+    return getattr(settings, 'FACET_PRICE_BUCKETS', [50, 100, 200, 500])
+
+
+def get_limit():
+    return getattr(settings, 'FACET_LIMIT', 20)
+
+
+def price_ranges():
+    """(min, max) price_per_night ranges, min inclusive and max exclusive; None is unbounded."""
+    bounds = [None, *get_price_buckets(), None]
+    return list(zip(bounds, bounds[1:]))
+
+
+def price_filter(low, high):
+    condition = Q()
+    if low is not None:
+        condition &= Q(price_per_night__gte=low)
+    if high is not None:
+        condition &= Q(price_per_night__lt=high)
+    return condition
+
+
+def get_facets(queryset):
+    """Facet counts for the listings of queryset."""
+    queryset = queryset.order_by().prefetch_related(None)
+    choice_fields = [('property_type', Property.PROPERTY_TYPES), ('room_type', Property.ROOM_TYPES)]
+    ranges = price_ranges()
+    
+    aggregates = {'total': Count('pk')}
+    for field, choices in choice_fields:
+        for i, (value, _) in enumerate(choices):
+            aggregates[f'{field}_{i}'] = Count('pk', filter=Q(**{field: value}))
+    for i, (low, high) in enumerate(ranges):
+        aggregates[f'price_{i}'] = Count('pk', filter=price_filter(low, high))
+    counts = queryset.aggregate(**aggregates)
+    
+    facets = {'count': counts['total']}
+    for field, choices in choice_fields:
+        facets[field] = [
+            {'value': value, 'label': label, 'count': counts[f'{field}_{i}']}
+            for i, (value, label) in enumerate(choices)
+        ]
+    facets['price'] = [
+        {'min': low, 'max': high, 'count': counts[f'price_{i}']}
+        for i, (low, high) in enumerate(ranges)
+    ]
+    facets['city'] = [
+        {'value': row['city'], 'count': row['count']}
+        for row in queryset.values('city').annotate(count=Count('pk')).order_by('-count', 'city')[:get_limit()]
+    ]
+    facets['amenities'] = [
+        {'value': amenity, 'count': count} for amenity, count in amenity_counts(queryset, get_limit())
+    ]
+    return facets
+
+
+def amenity_counts(queryset, limit):
+    """The most common amenities of queryset as (amenity, count) pairs, from the amenity index."""
+    links = PropertyAmenity.objects.all()
+    if queryset.query.where:
+        links = links.filter(property__in=queryset.values('pk'))
+    # Grouped by id on the (amenity, property) index; names are looked up for the top rows only
+    counts = list(
+        links.values_list('amenity_id').annotate(count=Count('property')).order_by('-count', 'amenity_id')[:limit]
+    )
+    names = Amenity.objects.in_bulk([amenity_id for amenity_id, _ in counts])
+    return [(names[amenity_id].name, count) for amenity_id, count in counts]
@@ -0,0 +1,46 @@
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+from .search import get_backend, search_properties
+
+
+class PropertyOrderingFilter(filters.OrderingFilter):
+    """
+    OrderingFilter whose default ordering may depend on the request (view.get_default_ordering())
+    and whose annotation-only fields (view.annotated_ordering_fields) are ignored when absent.
+    """
+    
+    def get_default_ordering(self, view):
+        if hasattr(view, 'get_default_ordering'):
+            return view.get_default_ordering()
+        return super().get_default_ordering(view)
+    
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        # view.annotated_ordering_fields exist only when the queryset was annotated with them
+        annotated = getattr(view, 'annotated_ordering_fields', [])
+        return [
+            term for term in super().remove_invalid_fields(queryset, fields, view, request)
+            if term.lstrip('-') not in annotated or term.lstrip('-') in queryset.query.annotations
+        ]
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    ?search= backed by properties.search: ranked full-text matching on PostgreSQL
+    and SQLite FTS5, DRF's icontains SearchFilter everywhere else.
+    
+    Place it after OrderingFilter; without an explicit ?ordering= results are sorted
+    by relevance, using the existing ordering as the tie-breaker.
+    """
+    
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        if get_backend(queryset.db) == 'fallback':
+            return super().filter_queryset(request, queryset, view)
+        
+        queryset = search_properties(queryset, query)
+        if not request.query_params.get(api_settings.ORDERING_PARAM):
+            queryset = queryset.order_by('-search_rank', *queryset.query.order_by)
+        return queryset
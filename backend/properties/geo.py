@@ -0,0 +1,97 @@
+"""
+Location search without PostGIS.
+
+Every property is assigned to a cell of a fixed latitude/longitude grid and the
+cell number is stored in the indexed Property.geo_cell column. Cells are numbered
+row by row, so the cells a bounding box covers form one contiguous id range per
+grid row; a box query is a handful of index range scans, refined by the exact
+latitude/longitude bounds. Distances are great-circle (haversine) distances
+computed in the database for the rows that survive the box filter.
+"""
+import math
+
+from django.db.models import FloatField, Q, Value
+from django.db.models.functions import ASin, Cast, Cos, Least, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+# 0.1 degrees is about 11 km of latitude
+GRID_SIZE = 0.1
+GRID_COLUMNS = int(round(360 / GRID_SIZE))
+GRID_ROWS = int(round(180 / GRID_SIZE))
+# Boxes taller than this skip the cell predicate; they match too much for it to help
+MAX_GRID_ROWS = 200
+
+
+def _row(lat):
+    return min(GRID_ROWS - 1, max(0, int(math.floor((lat + 90) / GRID_SIZE))))
+
+
+def _column(lng):
+    return min(GRID_COLUMNS - 1, max(0, int(math.floor((lng + 180) / GRID_SIZE))))
+
+
+def cell_for(lat, lng):
+    if lat is None or lng is None:
+        return None
+    return _row(float(lat)) * GRID_COLUMNS + _column(float(lng))
+
+
+def bbox_around(lat, lng, radius_km):
+    """(min_lat, min_lng, max_lat, max_lng) enclosing a circle; may cross the antimeridian."""
+    delta_lat = radius_km / KM_PER_DEGREE_LAT
+    min_lat, max_lat = max(-90.0, lat - delta_lat), min(90.0, lat + delta_lat)
+    cos_lat = math.cos(math.radians(lat))
+    if min_lat <= -90 or max_lat >= 90 or cos_lat < 1e-6:
+        return min_lat, -180.0, max_lat, 180.0
+    delta_lng = radius_km / (KM_PER_DEGREE_LAT * cos_lat)
+    if delta_lng >= 180:
+        return min_lat, -180.0, max_lat, 180.0
+    min_lng = lng - delta_lng
+    max_lng = lng + delta_lng
+    # Wrap into [-180, 180]; min_lng > max_lng then means the box crosses the antimeridian
+    if min_lng < -180:
+        min_lng += 360
+    if max_lng > 180:
+        max_lng -= 360
+    return min_lat, min_lng, max_lat, max_lng
+
+
+def bbox_filter(min_lat, min_lng, max_lat, max_lng):
+    """Q matching properties inside the box; min_lng > max_lng crosses the antimeridian."""
+    if min_lng <= max_lng:
+        lng_ranges = [(min_lng, max_lng)]
+    else:
+        lng_ranges = [(min_lng, 180.0), (-180.0, max_lng)]
+    
+    in_lng = Q()
+    for low, high in lng_ranges:
+        in_lng |= Q(longitude__gte=low, longitude__lte=high)
+    condition = Q(latitude__gte=min_lat, latitude__lte=max_lat) & in_lng
+    
+    first_row, last_row = _row(min_lat), _row(max_lat)
+    if last_row - first_row + 1 > MAX_GRID_ROWS:
+        return condition
+    
+    cells = Q()
+    for row in range(first_row, last_row + 1):
+        for low, high in lng_ranges:
+            cells |= Q(geo_cell__range=(row * GRID_COLUMNS + _column(low), row * GRID_COLUMNS + _column(high)))
+    return cells & condition
+
+
+def distance_km(lat, lng):
+    """Haversine distance in km from (lat, lng) to each row's coordinates."""
+    row_lat = Radians(Cast('latitude', FloatField()))
+    row_lng = Radians(Cast('longitude', FloatField()))
+    origin_lat = math.radians(lat)
+    origin_lng = math.radians(lng)
+    
+    half_chord = (
+        Power(Sin((row_lat - Value(origin_lat)) / Value(2.0)), Value(2.0)) +
+        Cos(row_lat) * Value(math.cos(origin_lat)) *
+        Power(Sin((row_lng - Value(origin_lng)) / Value(2.0)), Value(2.0))
+    )
+    # Least() guards ASin against rounding just above 1 for antipodal points
+    return Value(2.0 * EARTH_RADIUS_KM) * ASin(Least(Sqrt(half_chord), Value(1.0)))
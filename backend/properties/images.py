@@ -0,0 +1,203 @@
+"""
+Responsive variants for uploaded property images.
+
+Every PropertyImage is resized to the VARIANT_WIDTHS and saved once per format in
+FORMATS as ImageVariant rows, and a BlurHash string (https://blurha.sh) is stored
+in PropertyImage.placeholder so clients can paint a blurred preview straight
+from the JSON. Generation runs on a thread pool once the upload has been
+committed, never on the request thread; settings.IMAGE_WORKERS = 0 makes it
+synchronous.
+"""
+import io
+import logging
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from . import cache as response_cache
+from .models import ImageVariant, PropertyImage
+
+logger = logging.getLogger(__name__)
+
+# Widths are upper bounds; images are never upscaled
+VARIANT_WIDTHS = {
+    'thumbnail': 320,
+    'medium': 768,
+    'large': 1600,
+}
+
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+PLACEHOLDER_COMPONENTS = (4, 3)
+PLACEHOLDER_SAMPLE_SIZE = 32
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_worker_count():
+    return getattr(settings, 'IMAGE_WORKERS', 2)
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=get_worker_count(), thread_name_prefix='image-variants')
+        return _executor
+
+
+def schedule(image_id):
+    """Generate variants for image_id after the current transaction commits."""
+    transaction.on_commit(lambda: submit(image_id))
+
+
+def submit(image_id):
+    if get_worker_count() <= 0:
+        return generate_variants(image_id)
+    return get_executor().submit(run_in_worker, image_id)
+
+
+def run_in_worker(image_id):
+    try:
+        return generate_variants(image_id)
+    except Exception:
+        logger.exception('Generating variants for PropertyImage %s failed', image_id)
+        raise
+    finally:
+        # Pool threads outlive requests; don't leave their connections open
+        connections.close_all()
+
+
+def generate_variants(image_id):
+    """(Re)create every variant and the placeholder of one PropertyImage; returns the number of variants."""
+    try:
+        property_image = PropertyImage.objects.get(pk=image_id)
+    except PropertyImage.DoesNotExist:
+        # Deleted before a worker got to it
+        return 0
+    if not property_image.image:
+        return 0
+    
+    with property_image.image.open('rb') as source:
+        original = ImageOps.exif_transpose(Image.open(source)).convert('RGB')
+    
+    stem = os.path.splitext(os.path.basename(property_image.image.name))[0]
+    variants = []
+    for size, width in VARIANT_WIDTHS.items():
+        resized = resize(original, width)
+        for fmt, options in FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(buffer, **options)
+            variant = ImageVariant(
+                image=property_image, size=size, format=fmt, width=resized.width, height=resized.height
+            )
+            variant.file.save(f'{stem}_{size}.{EXTENSIONS[fmt]}', ContentFile(buffer.getvalue()), save=False)
+            variants.append(variant)
+    
+    with transaction.atomic():
+        updated = PropertyImage.objects.filter(pk=property_image.pk).update(
+            width=original.width,
+            height=original.height,
+            placeholder=blurhash(original),
+        )
+        if updated:
+            property_image.variants.all().delete()
+            ImageVariant.objects.bulk_create(variants)
+    
+    if not updated:
+        for variant in variants:
+            variant.file.delete(save=False)
+        return 0
+    
+    # Queryset updates bypass the signals that invalidate cached property responses
+    response_cache.bump_property(property_image.property_id)
+    return len(variants)
+
+
+def resize(image, width):
+    if image.width <= width:
+        return image
+    resized = image.copy()
+    resized.thumbnail((width, image.height), Image.LANCZOS, reducing_gap=3.0)
+    return resized
+
+
+BASE83 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+
+
+def _base83(value, length):
+    return ''.join(BASE83[(value // 83 ** (length - i)) % 83] for i in range(1, length + 1))
+
+
+def _srgb_to_linear(value):
+    value = value / 255
+    return value / 12.92 if value <= 0.04045 else ((value + 0.055) / 1.055) ** 2.4
+
+
+def _linear_to_srgb(value):
+    value = min(1.0, max(0.0, value))
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _sign_pow(value, exponent):
+    return math.copysign(abs(value) ** exponent, value)
+
+
+def blurhash(image, components=PLACEHOLDER_COMPONENTS):
+    """BlurHash of an RGB image, computed from a small downscaled copy."""
+    x_components, y_components = components
+    sample = image.copy()
+    sample.thumbnail((PLACEHOLDER_SAMPLE_SIZE, PLACEHOLDER_SAMPLE_SIZE))
+    width, height = sample.size
+    pixels = [tuple(_srgb_to_linear(channel) for channel in pixel) for pixel in sample.getdata()]
+    
+    factors = []
+    for j in range(y_components):
+        cos_y = [math.cos(math.pi * j * y / height) for y in range(height)]
+        for i in range(x_components):
+            cos_x = [math.cos(math.pi * i * x / width) for x in range(width)]
+            scale = (1 if i == 0 and j == 0 else 2) / (width * height)
+            r = g = b = 0.0
+            for y in range(height):
+                row = y * width
+                for x in range(width):
+                    basis = cos_x[x] * cos_y[y]
+                    pixel = pixels[row + x]
+                    r += basis * pixel[0]
+                    g += basis * pixel[1]
+                    b += basis * pixel[2]
+            factors.append((r * scale, g * scale, b * scale))
+    
+    dc, ac = factors[0], factors[1:]
+    result = _base83((x_components - 1) + (y_components - 1) * 9, 1)
+    
+    if ac:
+        actual_max = max(abs(channel) for factor in ac for channel in factor)
+        quantised_max = max(0, min(82, int(actual_max * 166 - 0.5)))
+        max_value = (quantised_max + 1) / 166
+    else:
+        quantised_max, max_value = 0, 1
+    result += _base83(quantised_max, 1)
+    
+    result += _base83((_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8) + _linear_to_srgb(dc[2]), 4)
+    for factor in ac:
+        r, g, b = (
+            max(0, min(18, int(math.floor(_sign_pow(channel / max_value, 0.5) * 9 + 9.5))))
+            for channel in factor
+        )
+        result += _base83(r * 19 * 19 + g * 19 + b, 2)
+    return result
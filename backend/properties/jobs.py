@@ -0,0 +1,214 @@
+"""
+Periodic background jobs, run by the run_jobs worker outside the request path.
+
+Jobs are registered with @job(name, interval) and return the number of items
+they processed. Each has a ScheduledJob row holding its next run time and a
+lease: a worker claims a due job with one conditional UPDATE, so several workers
+(or a cron-driven `run_jobs --once`) can run side by side without running a job
+twice. Intervals can be overridden per job in settings.JOB_INTERVALS.
+
+The booking jobs change statuses in batches of JOB_BATCH_SIZE with one UPDATE
+each, and do what the Booking signals would have done for those rows: free
+their BookedNight rows, refresh the host stats and invalidate cached
+availability.
+"""
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import cache as response_cache
+from . import stats
+from .models import BookedNight, Booking, IdempotencyKey, ScheduledJob
+
+logger = logging.getLogger(__name__)
+
+JOBS = {}
+
+
+class Job:
+    def __init__(self, name, func, interval):
+        self.name = name
+        self.func = func
+        self.default_interval = interval
+    
+    @property
+    def interval(self):
+        return getattr(settings, 'JOB_INTERVALS', {}).get(self.name, self.default_interval)
+
+
+def job(name, interval):
+    """Register the decorated function as a periodic job run every interval seconds."""
+    def decorator(func):
+        JOBS[name] = Job(name, func, interval)
+        return func
+    return decorator
+
+
+def get_batch_size():
+    return getattr(settings, 'JOB_BATCH_SIZE', 1000)
+
+
+def get_lease():
+    return timedelta(seconds=getattr(settings, 'JOB_LEASE', 600))
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def transition(queryset, status):
+    """Move the bookings of queryset to status in batches; returns how many moved."""
+    moved = 0
+    while True:
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:get_batch_size()])
+        if not ids:
+            break
+        with transaction.atomic():
+            # The UPDATE comes first so it takes the write lock, and re-applies the
+            # conditions of queryset: a booking confirmed since the select is left alone
+            queryset.filter(pk__in=ids).update(status=status, updated_at=timezone.now())
+            bookings = list(
+                Booking.objects.filter(pk__in=ids, status=status)
+                .only('id', 'property_id', 'check_in_date', 'check_out_date')
+            )
+            BookedNight.objects.filter(booking__in=bookings).delete()
+            if status not in stats.STATS_STATUSES:
+                stats.refresh(stats.stats_keys(bookings))
+        moved += len(bookings)
+    
+    if moved:
+        response_cache.bump_availability()
+    return moved
+
+
+@job('expire_pending_bookings', interval=300)
+def expire_pending_bookings():
+    """Expire pending bookings older than BOOKING_PENDING_TTL seconds or whose stay has begun."""
+    ttl = timedelta(seconds=getattr(settings, 'BOOKING_PENDING_TTL', 24 * 3600))
+    return transition(
+        Booking.objects.filter(status='pending').filter(
+            Q(created_at__lt=timezone.now() - ttl) | Q(check_in_date__lte=timezone.localdate())
+        ),
+        'expired',
+    )
+
+
+@job('complete_past_bookings', interval=3600)
+def complete_past_bookings():
+    """Mark confirmed bookings completed once checked out."""
+    return transition(
+        Booking.objects.filter(status='confirmed', check_out_date__lte=timezone.localdate()), 'completed'
+    )
+
+
+@job('prune_idempotency_keys', interval=3600)
+def prune_idempotency_keys():
+    """Delete Idempotency-Key records older than IDEMPOTENCY_KEY_TTL seconds."""
+    ttl = timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 3600))
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=timezone.now() - ttl).delete()
+    return deleted
+
+
+def sync_schedule():
+    """Create the ScheduledJob rows of registered jobs and apply changed intervals."""
+    for registered in JOBS.values():
+        scheduled, created = ScheduledJob.objects.get_or_create(
+            name=registered.name, defaults={'interval': registered.interval}
+        )
+        if not created and scheduled.interval != registered.interval:
+            ScheduledJob.objects.filter(pk=scheduled.pk).update(interval=registered.interval)
+
+
+def claim(scheduled, worker, force=False):
+    """Take the lease of a job; False when it is not due or another worker holds it."""
+    now = timezone.now()
+    claimable = ScheduledJob.objects.filter(pk=scheduled.pk).filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+    )
+    if not force:
+        claimable = claimable.filter(enabled=True, next_run_at__lte=now)
+    return claimable.update(locked_until=now + get_lease(), locked_by=worker, last_started_at=now) == 1
+
+
+def run(scheduled, worker):
+    """Run a claimed job and record the outcome; returns whether it succeeded."""
+    registered = JOBS[scheduled.name]
+    started = timezone.now()
+    start = time.perf_counter()
+    items, error = 0, ''
+    try:
+        items = registered.func() or 0
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('Job %s failed', scheduled.name)
+    duration = time.perf_counter() - start
+    if not error:
+        logger.info('Job %s processed %d items in %.3fs', scheduled.name, items, duration)
+    
+    ScheduledJob.objects.filter(pk=scheduled.pk, locked_by=worker).update(
+        next_run_at=started + timedelta(seconds=registered.interval),
+        locked_until=None,
+        locked_by='',
+        last_finished_at=timezone.now(),
+        last_succeeded=not error,
+        last_error=error,
+        last_items=items,
+        last_duration=duration,
+        run_count=F('run_count') + 1,
+        failure_count=F('failure_count') + (1 if error else 0),
+        items_total=F('items_total') + items,
+        duration_total=F('duration_total') + duration,
+    )
+    return not error
+
+
+def run_due(worker):
+    """Run every registered job that is due; returns the number of jobs run."""
+    count = 0
+    due = ScheduledJob.objects.filter(name__in=JOBS, enabled=True, next_run_at__lte=timezone.now())
+    for scheduled in due.order_by('next_run_at'):
+        if claim(scheduled, worker):
+            run(scheduled, worker)
+            count += 1
+    return count
+
+
+def seconds_until_due():
+    next_run_at = (
+        ScheduledJob.objects.filter(name__in=JOBS, enabled=True)
+        .order_by('next_run_at').values_list('next_run_at', flat=True).first()
+    )
+    if next_run_at is None:
+        return None
+    return max(0.0, (next_run_at - timezone.now()).total_seconds())
+
+
+def collect_metrics():
+    """Job counters for /metrics (airbnb_clone.metrics collector)."""
+    rows = list(ScheduledJob.objects.order_by('name').values(
+        'name', 'run_count', 'failure_count', 'items_total', 'duration_total', 'last_duration', 'last_finished_at'
+    ))
+    metrics = [
+        ('job_runs_total', 'counter', 'Runs of each background job.', 'run_count'),
+        ('job_failures_total', 'counter', 'Runs of each background job that raised an exception.', 'failure_count'),
+        ('job_items_total', 'counter', 'Items (bookings, keys) processed by each background job.', 'items_total'),
+        ('job_duration_seconds_total', 'counter', 'Time spent running each background job.', 'duration_total'),
+        ('job_last_duration_seconds', 'gauge', 'Duration of the last run of each background job.', 'last_duration'),
+    ]
+    collected = [
+        (name, kind, description, [({'job': row['name']}, row[field]) for row in rows])
+        for name, kind, description, field in metrics
+    ]
+    collected.append((
+        'job_last_finished_timestamp_seconds', 'gauge', 'When each background job last finished.',
+        [({'job': row['name']}, row['last_finished_at'].timestamp()) for row in rows if row['last_finished_at']],
+    ))
+    return collected
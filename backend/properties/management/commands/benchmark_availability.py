@@ -0,0 +1,61 @@
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from properties.benchmarking import format_stats, measure
+from properties.models import Booking, Property
+
+
+class Command(BaseCommand):
+    help = 'Compare date-range availability search on BookedNight with the Booking range subquery'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--nights', type=int, default=5)
+        parser.add_argument('--page-size', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        bounds = Booking.objects.aggregate(start=Min('check_in_date'), end=Max('check_out_date'))
+        if bounds['start'] is None:
+            raise CommandError('No bookings found; run populate_sample_data first')
+        
+        rng = random.Random(options['seed'])
+        nights = options['nights']
+        page_size = options['page_size']
+        span = max(1, (bounds['end'] - bounds['start']).days - nights)
+        
+        def random_range():
+            check_in = bounds['start'] + timedelta(days=rng.randrange(span))
+            return check_in, check_in + timedelta(days=nights)
+        
+        def booking_subquery():
+            check_in, check_out = random_range()
+            conflicting_bookings = Booking.objects.filter(
+                status__in=Booking.ACTIVE_STATUSES,
+                check_in_date__lt=check_out,
+                check_out_date__gt=check_in
+            ).values_list('property_id', flat=True)
+            queryset = Property.objects.exclude(id__in=conflicting_bookings)
+            return queryset.count(), list(queryset.values_list('id', flat=True)[:page_size])
+        
+        def booked_night_index():
+            check_in, check_out = random_range()
+            queryset = Property.objects.available_between(check_in, check_out)
+            return queryset.count(), list(queryset.values_list('id', flat=True)[:page_size])
+        
+        # Both strategies must agree before their timings mean anything
+        rng.seed(options['seed'])
+        expected = booking_subquery()
+        rng.seed(options['seed'])
+        if booked_night_index() != expected:
+            self.stderr.write('BookedNight results differ from Booking; run rebuild_availability')
+        
+        for label, fn in [
+            ('Booking exclude(id__in=...) subquery', booking_subquery),
+            ('BookedNight index (available_between)', booked_night_index),
+        ]:
+            rng.seed(options['seed'])
+            stats = measure(fn, repeat=options['repeat'])
+            self.stdout.write(format_stats(label, stats))
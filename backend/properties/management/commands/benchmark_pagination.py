@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIClient
+from properties.benchmarking import format_stats, measure
+from properties.models import Property
+from properties.pagination import KeysetPagination
+
+
+class Command(BaseCommand):
+    help = 'Compare page-number and keyset pagination latency on /api/properties/ at increasing depth'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--depths', default='1,10,100,1000,10000',
+                            help='Comma-separated page numbers to measure')
+        parser.add_argument('--page-size', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        page_size = options['page_size']
+        total = Property.objects.count()
+        if not total:
+            raise CommandError('No properties found; run populate_sample_data first')
+        
+        client = APIClient(SERVER_NAME='localhost')
+        keyset = KeysetPagination()
+        keyset.ordering = keyset.get_ordering(Property.objects.order_by('-created_at'))
+        
+        for depth in [int(value) for value in options['depths'].split(',')]:
+            offset = (depth - 1) * page_size
+            if offset >= total:
+                self.stdout.write(f'page {depth}: skipped, only {total} properties')
+                continue
+            
+            page_url = f'/api/properties/?fields=id&page_size={page_size}&page={depth}'
+            cursor_url = f'/api/properties/?fields=id&page_size={page_size}&pagination=cursor'
+            if depth > 1:
+                # The cursor a client holds after scrolling to this page
+                last_row = Property.objects.order_by(*keyset.ordering)[offset - 1]
+                cursor_url += f'&cursor={keyset.make_token(last_row)}'
+            
+            page_ids = [row['id'] for row in client.get(page_url).json()['results']]
+            cursor_ids = [row['id'] for row in client.get(cursor_url).json()['results']]
+            if sorted(page_ids) != sorted(cursor_ids):
+                self.stderr.write(f'page {depth}: page-number and keyset pages differ (created_at ties)')
+            
+            self.stdout.write(self.style.MIGRATE_HEADING(f'page {depth} (offset {offset})'))
+            self.stdout.write(format_stats('  page number (COUNT + OFFSET)', measure(lambda: client.get(page_url), repeat=options['repeat'])))
+            self.stdout.write(format_stats('  keyset cursor', measure(lambda: client.get(cursor_url), repeat=options['repeat'])))
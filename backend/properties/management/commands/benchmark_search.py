@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from properties.benchmarking import format_stats, measure
+from properties.models import Property
+from properties.search import get_backend, search_properties
+
+
+class Command(BaseCommand):
+    help = 'Compare ranked full-text search with the previous icontains search on the configured database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('queries', nargs='*', default=['beach', 'mountain cabin', 'downtown loft'])
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--page-size', type=int, default=10)
+
+    def handle(self, *args, **options):
+        if not Property.objects.exists():
+            raise CommandError('No properties found; run populate_sample_data first')
+        page_size = options['page_size']
+        self.stdout.write(f'Full-text backend: {get_backend(Property.objects.db)}')
+        
+        for query in options['queries']:
+            def icontains():
+                # The search action before full-text search was added
+                queryset = Property.objects.filter(
+                    Q(title__icontains=query) |
+                    Q(description__icontains=query) |
+                    Q(city__icontains=query) |
+                    Q(state__icontains=query) |
+                    Q(country__icontains=query)
+                ).filter(is_available=True)
+                return queryset.count(), list(queryset.values_list('id', flat=True)[:page_size])
+            
+            def full_text():
+                queryset = search_properties(
+                    Property.objects.filter(is_available=True), query
+                ).order_by('-search_rank', '-created_at')
+                return queryset.count(), list(queryset.values_list('id', flat=True)[:page_size])
+            
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'"{query}": icontains {icontains()[0]} matches, full-text {full_text()[0]} matches'
+            ))
+            self.stdout.write(format_stats('  icontains', measure(icontains, repeat=options['repeat'])))
+            self.stdout.write(format_stats('  full-text', measure(full_text, repeat=options['repeat'])))
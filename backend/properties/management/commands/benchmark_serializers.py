@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from properties.benchmarking import format_stats, measure
+from properties.models import Property
+from properties.serializers import PropertySerializer, PropertyListSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare response size and serialization time of the property list representations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        page_size = options['page_size']
+        repeat = options['repeat']
+        if not Property.objects.exists():
+            raise CommandError('No properties found; run populate_sample_data first')
+        
+        variants = [
+            ('PropertySerializer (previous list payload)', PropertySerializer, {},
+             lambda: Property.objects.with_related()),
+            ('PropertyListSerializer', PropertyListSerializer, {},
+             lambda: Property.objects.with_related(host=False, reviews=False)),
+            ('PropertyListSerializer ?fields=id,title,price', PropertyListSerializer,
+             {'fields': ['id', 'title', 'price_per_night']},
+             lambda: Property.objects.with_related(host=False, images=False, reviews=False)),
+            ('PropertyListSerializer ?expand=images,reviews', PropertyListSerializer,
+             {'expand': ['images', 'reviews']},
+             lambda: Property.objects.with_related(host=False)),
+        ]
+        
+        renderer = JSONRenderer()
+        baseline_bytes = None
+        for label, serializer_class, kwargs, queryset in variants:
+            def render():
+                page = queryset()[:page_size]
+                return renderer.render(serializer_class(page, many=True, **kwargs).data)
+            
+            size = len(render())
+            baseline_bytes = baseline_bytes or size
+            stats = measure(render, repeat=repeat)
+            self.stdout.write(
+                f'{format_stats(label, stats)}  {size:9d} bytes ({size / baseline_bytes:6.1%})'
+            )
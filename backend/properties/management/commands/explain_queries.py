@@ -0,0 +1,90 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.test import APIClient
+from properties.models import Property
+
+
+class Command(BaseCommand):
+    help = 'Run the API query shapes and print the database query plan for every SELECT they issue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--analyze', action='store_true',
+                            help='Use EXPLAIN ANALYZE (PostgreSQL only; executes the queries)')
+        parser.add_argument('--scans-only', action='store_true',
+                            help='Only print queries whose plan contains a full table scan')
+
+    def handle(self, *args, **options):
+        property_obj = Property.objects.order_by('id').first()
+        user = User.objects.order_by('id').first()
+        if property_obj is None or user is None:
+            raise CommandError('No data found; run populate_sample_data first')
+        
+        check_in = date.today() + timedelta(days=14)
+        check_out = check_in + timedelta(days=3)
+        anonymous = [
+            '/api/properties/',
+            f'/api/properties/?city={property_obj.city}',
+            f'/api/properties/?state={property_obj.state}',
+            f'/api/properties/?country={property_obj.country}',
+            '/api/properties/?property_type=house&room_type=entire',
+            '/api/properties/?min_price=100&max_price=300',
+            '/api/properties/?guests=4',
+            '/api/properties/?is_available=true&is_featured=true',
+            f'/api/properties/?check_in={check_in}&check_out={check_out}',
+            f'/api/properties/?lat={property_obj.latitude or 0}&lng={property_obj.longitude or 0}&radius_km=10',
+            '/api/properties/?bbox=-123,37,-122,38',
+            '/api/properties/?ordering=price_per_night',
+            '/api/properties/?ordering=-average_rating',
+            '/api/properties/featured/',
+            '/api/properties/search/?q=beach',
+            f'/api/properties/{property_obj.pk}/',
+            '/api/reviews/',
+        ]
+        authenticated = [
+            '/api/bookings/',
+        ]
+        
+        explain_options = {'analyze': True} if options['analyze'] else {}
+        self.explain_prefix = connection.ops.explain_query_prefix(**explain_options)
+        for url in anonymous:
+            self.explain_request(APIClient(SERVER_NAME='localhost'), url, options['scans_only'])
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(user)
+        for url in authenticated:
+            self.explain_request(client, url, options['scans_only'])
+
+    def explain_request(self, client, url, scans_only):
+        queries = []
+        
+        def capture(execute, sql, params, many, context):
+            queries.append((sql, params))
+            return execute(sql, params, many, context)
+        
+        with connection.execute_wrapper(capture):
+            response = client.get(url)
+        
+        self.stdout.write(self.style.MIGRATE_HEADING(f'GET {url} -> {response.status_code}, {len(queries)} queries'))
+        seen = set()
+        for sql, params in queries:
+            if not sql.lstrip().upper().startswith('SELECT') or sql in seen:
+                continue
+            seen.add(sql)
+            with connection.cursor() as cursor:
+                cursor.execute(f'{self.explain_prefix} {sql}', params)
+                plan = [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+            has_scan = any(self.is_full_scan(line) for line in plan)
+            if scans_only and not has_scan:
+                continue
+            self.stdout.write(f'  {sql}')
+            for line in plan:
+                style = self.style.WARNING if self.is_full_scan(line) else (lambda text: text)
+                self.stdout.write(style(f'    {line}'))
+
+    def is_full_scan(self, line):
+        # SQLite: "SCAN <table>" without "USING ... INDEX"; PostgreSQL: "Seq Scan"
+        if 'Seq Scan' in line:
+            return True
+        return ' SCAN ' in f' {line} ' and 'INDEX' not in line
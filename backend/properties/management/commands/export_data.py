@@ -0,0 +1,72 @@
+import json
+import sys
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.http import HttpRequest, QueryDict
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from properties.export import BOOKING_FIELDS, PROPERTY_FIELDS, stream_rows
+from properties.models import Booking
+from properties.views import BookingViewSet, PropertyViewSet
+
+
+class Command(BaseCommand):
+    help = 'Stream every property or booking matching the API filters to NDJSON or CSV in constant memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=['properties', 'bookings'])
+        parser.add_argument('--format', choices=['ndjson', 'csv'], default='ndjson')
+        parser.add_argument('--output', help='File to write (default: stdout)')
+        parser.add_argument('--query', default='',
+                            help='Filters as the API query string, e.g. "city=Paris&min_price=100&ordering=price_per_night"')
+        parser.add_argument('--user', help='Export bookings of this username only (default: all bookings)')
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help='Rows fetched and written per chunk (default: settings.EXPORT_CHUNK_SIZE)')
+
+    def handle(self, *args, **options):
+        try:
+            queryset, fields = self.get_queryset(options)
+        except ValidationError as exc:
+            raise CommandError(f'Invalid --query: {json.dumps(exc.detail)}')
+        
+        started = time.perf_counter()
+        output = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            for text in stream_rows(queryset, fields, options['format'], options['chunk_size']):
+                output.write(text)
+        finally:
+            if options['output']:
+                size = output.tell()
+                output.close()
+        
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Exported {options["model"]} to {options["output"]} ({size / 1024 / 1024:.1f} MiB) '
+                f'in {time.perf_counter() - started:.1f}s'
+            ))
+
+    def get_queryset(self, options):
+        """The queryset the export action would stream for the same query string."""
+        request = HttpRequest()
+        request.method = 'GET'
+        request.GET = QueryDict(options['query'])
+        
+        if options['model'] == 'properties':
+            viewset = PropertyViewSet(action='export', format_kwarg=None, args=(), kwargs={})
+            viewset.request = Request(request)
+            return viewset.filter_queryset(viewset.get_queryset()), PROPERTY_FIELDS
+        
+        viewset = BookingViewSet(action='export', format_kwarg=None, args=(), kwargs={})
+        viewset.request = Request(request)
+        if options['user']:
+            try:
+                viewset.request.user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'No user named {options["user"]!r}')
+            queryset = viewset.get_queryset()
+        else:
+            # The same status/start/end filters, over every user's bookings
+            queryset = viewset.filter_bookings(Booking.objects.all())
+        return viewset.filter_queryset(queryset), BOOKING_FIELDS
@@ -0,0 +1,60 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from properties import images
+from properties.models import ImageVariant, PropertyImage
+
+
+class Command(BaseCommand):
+    help = 'Generate resized WebP/JPEG variants and placeholders for property images that have none'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Regenerate variants for every image, not just those missing them')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Number of images processed in parallel')
+
+    def handle(self, *args, **options):
+        queryset = PropertyImage.objects.exclude(image='')
+        if not options['all']:
+            queryset = queryset.filter(variants__isnull=True)
+        image_ids = list(queryset.order_by('id').values_list('id', flat=True).distinct())
+        
+        started = time.perf_counter()
+        generated = failed = 0
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as executor:
+            futures = {executor.submit(images.run_in_worker, image_id): image_id for image_id in image_ids}
+            for future in as_completed(futures):
+                try:
+                    generated += future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f'Image {futures[future]}: {exc}')
+        elapsed = time.perf_counter() - started
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {generated} variants for {len(image_ids) - failed} images in {elapsed:.1f}s'
+            + (f' ({failed} failed)' if failed else '')
+        ))
+        self.report_sizes()
+
+    def report_sizes(self):
+        # Average bytes a client downloads per image: the original versus each variant
+        rows = [('original', [image.image for image in PropertyImage.objects.exclude(image='').only('image')])]
+        for size in images.VARIANT_WIDTHS:
+            for fmt in images.FORMATS:
+                variants = ImageVariant.objects.filter(size=size, format=fmt).only('file')
+                rows.append((f'{size} {fmt}', [variant.file for variant in variants]))
+        
+        for label, files in rows:
+            sizes = [size for size in map(self.file_size, files) if size is not None]
+            if sizes:
+                self.stdout.write(f'{label:<20} {sum(sizes) / len(sizes) / 1024:10.1f} KiB/image')
+
+    @staticmethod
+    def file_size(field):
+        try:
+            return field.size
+        except (OSError, ValueError):
+            return None
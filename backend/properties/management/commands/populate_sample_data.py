@@ -1,15 +1,42 @@
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
+from django.db import connection, connections
+from properties import sample_data
 from properties.models import Property, PropertyImage, Review, Booking
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from decimal import Decimal
 from datetime import date, timedelta
 import random
+import time
 
 
 class Command(BaseCommand):
-    help = 'Populate the database with sample data for the Airbnb clone'
+    help = (
+        'Populate the database with sample data for the Airbnb clone. With --users, --properties or '
+        '--bookings, generate that many rows in bulk for load testing instead.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, help='Number of users to generate')
+        parser.add_argument('--properties', type=int, help='Number of properties to generate')
+        parser.add_argument('--bookings', type=int,
+                            help='Number of bookings to generate, spread over the new properties '
+                                 '(or all properties when none are generated)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed produces the same data')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Processes inserting in parallel (helps on PostgreSQL; SQLite serializes writers)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT statement')
+        parser.add_argument('--chunk-size', type=int, default=20000, help='Rows generated per worker task')
+        parser.add_argument('--password', default='password123', help='Password of every generated user')
 
     def handle(self, *args, **options):
+        if any(options[name] is not None for name in ('users', 'properties', 'bookings')):
+            self.generate(options)
+            return
+        
         self.stdout.write('Creating sample data...')
         
         # Create sample users
@@ -63,14 +90,14 @@ class Command(BaseCommand):
             }
         ]
         
+        # Hashing is deliberately slow; every sample user shares the same password
+        password_hash = make_password('password123')
         for user_data in sample_users_data:
+            user_data['password'] = password_hash
             user, created = User.objects.get_or_create(
                 username=user_data['username'],
                 defaults=user_data
             )
-            if created:
-                user.set_password(user_data['password'])
-                user.save()
             users.append(user)
             self.stdout.write(f'Created user: {user.username}')
         
@@ -199,18 +226,15 @@ class Command(BaseCommand):
         for property_obj in properties:
             # Create 2-4 reviews per property
             num_reviews = random.randint(2, 4)
-            for i in range(num_reviews):
+            # Distinct reviewers, so the one-review-per-user constraint always holds
+            for user in random.sample(users, min(num_reviews, len(users))):
                 review_data = random.choice(sample_reviews)
-                user = random.choice(users)
-                
-                # Make sure user hasn't already reviewed this property
-                if not Review.objects.filter(property=property_obj, user=user).exists():
-                    Review.objects.create(
-                        property=property_obj,
-                        user=user,
-                        rating=review_data['rating'],
-                        comment=review_data['comment']
-                    )
+                Review.objects.create(
+                    property=property_obj,
+                    user=user,
+                    rating=review_data['rating'],
+                    comment=review_data['comment']
+                )
         
         self.stdout.write('Created sample reviews')
 
@@ -245,4 +269,106 @@ class Command(BaseCommand):
                 status='confirmed'
             )
         
-        self.stdout.write('Created sample bookings') 
\ No newline at end of file
+        self.stdout.write('Created sample bookings') 
+
+    def generate(self, options):
+        seed = options['seed']
+        batch_size = options['batch_size']
+        chunk_size = options['chunk_size']
+        started = time.perf_counter()
+        
+        prefix = f'loadtest{seed}_'
+        user_count = options['users'] or 0
+        if user_count:
+            password_hash = make_password(options['password'])
+            offset = User.objects.filter(username__startswith=prefix).count()
+            self.run_phase('users', options, None, [
+                (sample_data.generate_users, seed, start, min(chunk_size, offset + user_count - start),
+                 prefix, password_hash, batch_size)
+                for start in range(offset, offset + user_count, chunk_size)
+            ])
+        
+        user_ids = list(User.objects.filter(username__startswith=prefix).values_list('id', flat=True))
+        if not user_ids:
+            user_ids = list(User.objects.values_list('id', flat=True))
+        if not user_ids:
+            self.stderr.write('No users to host properties or make bookings; pass --users')
+            return
+        
+        property_count = options['properties'] or 0
+        last_existing_id = Property.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        if property_count:
+            self.run_phase('properties', options, user_ids, [
+                (sample_data.generate_properties, seed, start, min(chunk_size, property_count - start), batch_size)
+                for start in range(0, property_count, chunk_size)
+            ])
+        
+        booking_count = options['bookings'] or 0
+        if booking_count:
+            property_ids = Property.objects.order_by('id').values_list('id', flat=True)
+            if property_count:
+                property_ids = property_ids.filter(id__gt=last_existing_id)
+            property_ids = list(property_ids)
+            # Chunks of properties, each getting its share of the bookings
+            properties_per_chunk = max(1, chunk_size // 10)
+            chunks = [
+                property_ids[i:i + properties_per_chunk]
+                for i in range(0, len(property_ids), properties_per_chunk)
+            ]
+            shares = [booking_count * len(chunk) // max(1, len(property_ids)) for chunk in chunks]
+            if shares:
+                shares[0] += booking_count - sum(shares)
+            rows = self.run_phase('bookings', options, user_ids, [
+                (sample_data.generate_bookings, seed, chunk[0], chunk[-1], share, batch_size)
+                for chunk, share in zip(chunks, shares) if share
+            ])
+            skipped = booking_count - rows['bookings']
+            if skipped:
+                self.stdout.write(self.style.WARNING(
+                    f'Skipped {skipped:,} of {booking_count:,} bookings whose nights were already booked'
+                ))
+        
+        # Bulk inserts skipped the signals that maintain these
+        self.stdout.write('Rebuilding derived data...')
+        if booking_count and not connection.features.can_return_rows_from_bulk_insert:
+            call_command('rebuild_availability', stdout=self.stdout)
+        if booking_count:
+            call_command('rebuild_rating_aggregates', stdout=self.stdout)
+            call_command('rebuild_host_stats', stdout=self.stdout)
+        if property_count:
+            call_command('rebuild_search_index', stdout=self.stdout)
+            call_command('rebuild_amenity_index', stdout=self.stdout)
+        
+        self.stdout.write(self.style.SUCCESS(f'Finished in {time.perf_counter() - started:.1f}s'))
+
+    def run_phase(self, label, options, user_ids, tasks):
+        """Run generator tasks inline or on a process pool, report rows per second and return the row counts."""
+        started = time.perf_counter()
+        rows = Counter()
+        workers = min(options['workers'], len(tasks))
+        if workers > 1:
+            # Children must open their own connections rather than share the parent's
+            connections.close_all()
+            with ProcessPoolExecutor(workers, initializer=sample_data.init_worker, initargs=(user_ids,)) as executor:
+                futures = [executor.submit(*task) for task in tasks]
+                for future in futures:
+                    rows.update(future.result())
+                    self.report_progress(label, rows, started)
+        else:
+            sample_data.init_worker(user_ids)
+            for task in tasks:
+                rows.update(task[0](*task[1:]))
+                self.report_progress(label, rows, started)
+        
+        elapsed = time.perf_counter() - started
+        total = sum(rows.values())
+        summary = ', '.join(f'{count} {kind}' for kind, count in rows.items())
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {summary} in {elapsed:.1f}s ({total / elapsed if elapsed else 0:,.0f} rows/sec)'
+        ))
+        return rows
+
+    def report_progress(self, label, rows, started):
+        elapsed = time.perf_counter() - started
+        total = sum(rows.values())
+        self.stdout.write(f'  {label}: {total:,} rows, {total / elapsed if elapsed else 0:,.0f} rows/sec')
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from properties import cache as response_cache
+from properties.models import Amenity, Property, PropertyAmenity
+
+
+class Command(BaseCommand):
+    help = 'Regenerate the amenity index (Amenity, PropertyAmenity) from Property.amenities'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Number of properties indexed per batch')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        
+        created = 0
+        last_id = 0
+        with transaction.atomic():
+            PropertyAmenity.objects.all().delete()
+            
+            while True:
+                batch = list(
+                    Property.objects.filter(id__gt=last_id).order_by('id')
+                    .values_list('id', 'amenities')[:batch_size]
+                )
+                if not batch:
+                    break
+                names = {
+                    property_id: {name for name in amenities or [] if isinstance(name, str)}
+                    for property_id, amenities in batch
+                }
+                ids = Amenity.get_ids(set().union(*names.values()))
+                links = [
+                    PropertyAmenity(property_id=property_id, amenity_id=ids[name])
+                    for property_id, property_names in names.items()
+                    for name in property_names
+                ]
+                PropertyAmenity.objects.bulk_create(links, batch_size=batch_size)
+                created += len(links)
+                last_id = batch[-1][0]
+        
+        # Bulk writes skip the model signals that normally invalidate cached responses
+        response_cache.bump_all()
+        
+        self.stdout.write(self.style.SUCCESS(f'Indexed {created} property amenities'))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from properties import cache as response_cache
+from properties.models import BookedNight, Booking
+
+
+class Command(BaseCommand):
+    help = 'Regenerate the BookedNight availability index from pending and confirmed bookings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Number of BookedNight rows inserted per statement')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        
+        bookings = (
+            Booking.objects.filter(status__in=Booking.ACTIVE_STATUSES)
+            .order_by('created_at', 'id')
+            .values_list('id', 'property_id', 'check_in_date', 'check_out_date')
+        )
+        
+        created = 0
+        with transaction.atomic():
+            BookedNight.objects.all().delete()
+            
+            batch = []
+            for booking_id, property_id, check_in_date, check_out_date in bookings.iterator(chunk_size=batch_size):
+                for night in Booking.night_dates(check_in_date, check_out_date):
+                    batch.append(BookedNight(property_id=property_id, booking_id=booking_id, date=night))
+                if len(batch) >= batch_size:
+                    BookedNight.objects.bulk_create(batch, ignore_conflicts=True)
+                    created += len(batch)
+                    batch = []
+            if batch:
+                BookedNight.objects.bulk_create(batch, ignore_conflicts=True)
+                created += len(batch)
+        
+        # Bulk writes skip the model signals that normally invalidate cached responses
+        response_cache.bump_all()
+        
+        self.stdout.write(self.style.SUCCESS(f'Indexed {created} booked nights'))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from properties import cache as response_cache
+from properties import geo
+from properties.models import Property
+
+
+class Command(BaseCommand):
+    help = 'Recompute Property.geo_cell (the location search grid) from latitude/longitude'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        
+        updated = 0
+        last_id = 0
+        while True:
+            batch = list(
+                Property.objects.filter(id__gt=last_id).order_by('id')
+                .only('id', 'latitude', 'longitude', 'geo_cell')[:batch_size]
+            )
+            if not batch:
+                break
+            changed = []
+            for property_obj in batch:
+                cell = geo.cell_for(property_obj.latitude, property_obj.longitude)
+                if cell != property_obj.geo_cell:
+                    property_obj.geo_cell = cell
+                    changed.append(property_obj)
+            with transaction.atomic():
+                Property.objects.bulk_update(changed, ['geo_cell'])
+            updated += len(changed)
+            last_id = batch[-1].id
+        
+        # Bulk writes skip the model signals that normally invalidate cached responses
+        response_cache.bump_all()
+        
+        self.stdout.write(self.style.SUCCESS(f'Updated geo_cell on {updated} properties'))
@@ -0,0 +1,36 @@
+from itertools import groupby
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from properties import stats
+from properties.models import Booking, PropertyMonthStats
+
+
+class Command(BaseCommand):
+    help = 'Regenerate the PropertyMonthStats rollup behind the host dashboard from the bookings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Number of PropertyMonthStats rows inserted per statement')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        rows = stats.booking_rows(Booking.objects.order_by('property_id')).iterator(chunk_size=batch_size)
+        
+        created = 0
+        with transaction.atomic():
+            PropertyMonthStats.objects.all().delete()
+            
+            # One property's bookings at a time, so memory doesn't grow with the table
+            batch = []
+            for _, property_rows in groupby(rows, key=lambda row: row[0]):
+                batch.extend(stats.stats_objects(stats.accumulate(property_rows)))
+                if len(batch) >= batch_size:
+                    PropertyMonthStats.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            if batch:
+                PropertyMonthStats.objects.bulk_create(batch)
+                created += len(batch)
+        
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {created} property months'))
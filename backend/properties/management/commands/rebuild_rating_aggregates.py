@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Avg, Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from properties import cache as response_cache
+from properties.models import Property, Review
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized rating_sum, review_count and average_rating columns on Property'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000,
+                            help='Number of properties updated per UPDATE statement')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        
+        reviews = Review.objects.filter(property=OuterRef('pk')).order_by().values('property')
+        rating_sum = Subquery(reviews.annotate(total=Sum('rating')).values('total'))
+        review_count = Subquery(reviews.annotate(total=Count('id')).values('total'))
+        average_rating = Subquery(reviews.annotate(total=Avg('rating')).values('total'))
+        
+        updated = 0
+        last_id = 0
+        while True:
+            ids = list(
+                Property.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                updated += Property.objects.filter(id__in=ids).update(
+                    rating_sum=Coalesce(rating_sum, 0),
+                    review_count=Coalesce(review_count, 0),
+                    average_rating=Coalesce(average_rating, 0.0),
+                )
+            last_id = ids[-1]
+        
+        # Bulk writes skip the model signals that normally invalidate cached responses
+        response_cache.bump_all()
+        
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating aggregates for {updated} properties'))
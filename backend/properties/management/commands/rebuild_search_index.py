@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+from properties import search
+
+
+class Command(BaseCommand):
+    help = 'Create the full-text search index if needed and repopulate it from Property'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if not search.ensure_search_index(using=using):
+            self.stdout.write(self.style.WARNING('No full-text index available; search falls back to icontains'))
+            return
+        
+        backend = search.get_backend(using)
+        if backend == 'postgresql':
+            self.stdout.write(self.style.SUCCESS(f'GIN index {search.GIN_INDEX} is in place'))
+            return
+        indexed = search.rebuild_search_index(using=using)
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} properties in {search.FTS_TABLE}'))
@@ -0,0 +1,414 @@
+import itertools
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from urllib.parse import quote
+from datetime import date, datetime, timedelta, timezone
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authtoken.models import Token
+from properties.benchmarking import (
+    ThreadSampler, format_stats, get_transport, load, measure, summarize, throughput
+)
+from properties.models import Booking, Property, Review
+
+BENCHMARK_USERNAME = 'benchmark_user'
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+# Bookings made by the suite start this far out so they never collide with real ones
+BOOKING_OFFSET_DAYS = 3650
+
+DEFAULT_BUDGETS = os.path.join(settings.BASE_DIR, 'benchmarks', 'budgets.json')
+
+# Metrics a run may not exceed; throughput_rps may not drop below its budget
+CEILING_METRICS = ['p50_ms', 'p95_ms', 'p99_ms', 'peak_memory_kb']
+FLOOR_METRICS = ['throughput_rps']
+# Budgeted exactly: a run with more or fewer queries fails, so the budget never goes stale
+EXACT_METRICS = ['queries']
+
+# Headroom --update-budgets leaves over the measured value: a factor, plus an absolute
+# slack so sub-millisecond timings don't produce budgets that jitter alone exceeds
+BUDGET_HEADROOM = {'p50_ms': 2.0, 'p95_ms': 2.0, 'p99_ms': 2.5, 'peak_memory_kb': 1.5, 'throughput_rps': 0.5}
+BUDGET_SLACK = {'p50_ms': 5, 'p95_ms': 10, 'p99_ms': 20, 'peak_memory_kb': 64}
+
+# Budgets are keyed by the transport asked for, whichever ASGI server ran it
+BUDGET_TRANSPORTS = {'asgi-inprocess': 'asgi'}
+
+# --compare-async: (deployment, transport, URL prefix of the property endpoints)
+COMPARE_DEPLOYMENTS = [
+    ('wsgi', 'wsgi', '/api/properties/'),
+    ('asgi-drf', 'asgi', '/api/properties/'),
+    ('asgi-async', 'asgi', '/api/async/properties/'),
+]
+COMPARE_ENDPOINTS = ['list', 'featured', 'search', 'retrieve']
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the main API endpoints through the test client and real WSGI/ASGI servers, '
+        'write the results as JSON and fail when a run exceeds the stored budgets'
+    )
+
+    scenarios = ['list', 'search', 'featured', 'retrieve', 'book', 'add_review', 'bookings', 'login', 'login_alt']
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', default=','.join(self.scenarios),
+                            help='Comma-separated scenarios to run')
+        parser.add_argument('--transports', default='client,wsgi,asgi',
+                            help='client (test client), wsgi (threaded WSGI server), asgi (uvicorn, or '
+                                 'ASGIHandler in-process when uvicorn is not installed)')
+        parser.add_argument('--repeat', type=int, default=30, help='Timed requests per scenario')
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--concurrency', type=int, default=4,
+                            help='Threads used for the throughput measurement')
+        parser.add_argument('--throughput-requests', type=int, default=40,
+                            help='Requests per throughput measurement (0 to skip it)')
+        parser.add_argument('--output', help='Write results to this JSON file')
+        parser.add_argument('--budgets', default=DEFAULT_BUDGETS, help='Budgets JSON file')
+        parser.add_argument('--check', action='store_true',
+                            help='Fail if a query count differs from its budget; other budgets only warn')
+        parser.add_argument('--strict-timings', action='store_true',
+                            help='With --check, also fail on latency, throughput and memory budgets')
+        parser.add_argument('--update-budgets', action='store_true',
+                            help='Rewrite the budgets file from this run (with headroom)')
+        parser.add_argument('--no-response-cache', action='store_true',
+                            help='Disable the property response cache so reads always hit the database '
+                                 '(implied by --check and --update-budgets)')
+        parser.add_argument('--fresh', action='store_true',
+                            help='Run against a throwaway database filled by populate_sample_data')
+        parser.add_argument('--scale', type=int, default=1,
+                            help='Dataset size for --fresh: 100 users, 1000 properties, 5000 bookings per unit')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--compare-async', action='store_true',
+                            help='Instead of the scenarios, load the property browse endpoints with --concurrency '
+                                 'clients on the WSGI server, the DRF views under ASGI and the async views under '
+                                 'ASGI, and compare throughput, latency, memory and threads')
+
+    def handle(self, *args, **options):
+        unknown = set(options['scenarios'].split(',')) - set(self.scenarios)
+        if unknown:
+            raise CommandError(f'Unknown scenarios: {", ".join(sorted(unknown))}')
+        if options['compare_async'] and (options['update_budgets'] or not options['throughput_requests']):
+            raise CommandError('--compare-async needs --throughput-requests and cannot --update-budgets')
+        
+        run = self.run_comparison if options['compare_async'] else self.run_suite
+        # Budgets hold what the endpoints cost, not what a cache hit costs (no queries at all)
+        if options['check'] or options['update_budgets']:
+            options['no_response_cache'] = True
+        old_name = self.create_fresh_database(options) if options['fresh'] else None
+        try:
+            if options['no_response_cache']:
+                with override_settings(
+                    CACHES={**settings.CACHES, 'benchmark': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+                    API_CACHE_ALIAS='benchmark',
+                ):
+                    results = run(options)
+            else:
+                results = run(options)
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+        
+        report = {'meta': self.get_meta(options), 'results': results}
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+        
+        if options['update_budgets']:
+            self.write_budgets(options['budgets'], results)
+            self.stdout.write(f'Budgets written to {options["budgets"]}')
+        elif options['check']:
+            self.check_budgets(options['budgets'], results, options)
+
+    def create_fresh_database(self, options):
+        if connection.vendor == 'sqlite':
+            # A file rather than shared in-memory SQLite, so server threads can write concurrently
+            connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(), 'benchmark.sqlite3')
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=False)
+        scale = options['scale']
+        call_command(
+            'populate_sample_data', users=100 * scale, properties=1000 * scale, bookings=5000 * scale,
+            seed=options['seed'], stdout=open(os.devnull, 'w'),
+        )
+        return old_name
+
+    def run_suite(self, options):
+        self.prepare_fixtures(options)
+        results = []
+        try:
+            for transport_name in options['transports'].split(','):
+                transport = get_transport(transport_name).start()
+                self.stdout.write(self.style.MIGRATE_HEADING(f'{transport.name} transport'))
+                try:
+                    for scenario in options['scenarios'].split(','):
+                        results.append(self.run_scenario(scenario, transport, options))
+                finally:
+                    transport.stop()
+        finally:
+            self.cleanup()
+        return results
+
+    def run_comparison(self, options):
+        self.prepare_fixtures(options)
+        paths = {
+            'list': '',
+            'featured': 'featured/',
+            'search': f'search/?q={quote(self.search_term)}',
+            'retrieve': f'{self.property_id}/',
+        }
+        results = []
+        try:
+            for deployment, transport_name, prefix in COMPARE_DEPLOYMENTS:
+                transport = get_transport(transport_name).start()
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f'{deployment} ({transport.name}), {options["concurrency"]} concurrent clients'
+                ))
+                try:
+                    for endpoint in COMPARE_ENDPOINTS:
+                        results.append(self.run_load(deployment, endpoint, prefix + paths[endpoint], transport, options))
+                finally:
+                    transport.stop()
+        finally:
+            self.cleanup()
+        
+        self.stdout.write(self.style.MIGRATE_HEADING('asgi-async relative to wsgi'))
+        by_key = {(result['transport'], result['scenario']): result for result in results}
+        for endpoint in COMPARE_ENDPOINTS:
+            wsgi, asgi = by_key[('wsgi', endpoint)], by_key[('asgi-async', endpoint)]
+            self.stdout.write(
+                f"  {endpoint:<10} throughput x{asgi['throughput_rps'] / (wsgi['throughput_rps'] or 1):.2f}  "
+                f"p95 x{asgi['p95_ms'] / (wsgi['p95_ms'] or 1):.2f}  "
+                f"peak memory x{asgi['peak_memory_kb'] / (wsgi['peak_memory_kb'] or 1):.2f}  "
+                f"threads {wsgi['peak_threads']} -> {asgi['peak_threads']}"
+            )
+        return results
+
+    def run_load(self, deployment, endpoint, path, transport, options):
+        """Throughput, latency and peak threads under load, then a shorter traced run for peak memory."""
+        errors = []
+        
+        def send():
+            status, content = transport.request('GET', path)
+            if status != 200:
+                errors.append(f'GET {path} returned {status}: {content[:200]!r}')
+        
+        for _ in range(options['warmup']):
+            send()
+        
+        concurrency = options['concurrency']
+        with ThreadSampler() as threads:
+            elapsed, samples = load(send, options['throughput_requests'], concurrency)
+        
+        # Allocations of the client threads are included, but they are the same for every deployment
+        tracemalloc.start()
+        try:
+            load(send, concurrency * 2, concurrency)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        
+        stats = summarize(samples)
+        rps = len(samples) / elapsed if elapsed else 0.0
+        result = {
+            'scenario': endpoint,
+            'transport': deployment,
+            **{key: round(value, 3) if isinstance(value, float) else value for key, value in stats.items()},
+            'throughput_rps': round(rps, 1),
+            'peak_memory_kb': round(peak / 1024, 1),
+            'peak_threads': threads.peak,
+            'errors': len(errors),
+        }
+        self.stdout.write(
+            format_stats(f'  {endpoint}', stats, width=14) + f"  p99 {stats['p99_ms']:8.2f} ms  {rps:8.1f} req/s"
+            f"  {result['peak_memory_kb']:8.1f} KiB peak  {threads.peak:3d} threads"
+        )
+        for error in errors[:3]:
+            self.stderr.write(f'    {error}')
+        return result
+
+    def prepare_fixtures(self, options):
+        if not Property.objects.exists():
+            raise CommandError('No properties found; run populate_sample_data first or pass --fresh')
+        
+        self.user, created = User.objects.get_or_create(username=BENCHMARK_USERNAME)
+        if created or not self.user.check_password(BENCHMARK_PASSWORD):
+            self.user.set_password(BENCHMARK_PASSWORD)
+            self.user.save()
+        self.token = Token.objects.get_or_create(user=self.user)[0].key
+        
+        self.cleanup()
+        self.property_id = Property.objects.order_by('-review_count', 'id').values_list('id', flat=True).first()
+        self.search_term = Property.objects.filter(pk=self.property_id).values_list('city', flat=True).first()
+        self.booking_start = date.today() + timedelta(days=BOOKING_OFFSET_DAYS)
+        self.counter = itertools.count()
+        
+        # Every add_review request needs a property the benchmark user has not reviewed yet
+        per_scenario = options['warmup'] + options['repeat'] + 1 + options['throughput_requests']
+        needed = per_scenario * len(options['transports'].split(','))
+        self.review_property_ids = list(Property.objects.order_by('id').values_list('id', flat=True)[:needed])
+        self.review_counter = itertools.count()
+        
+        # A booking for the bookings list to return
+        Booking.objects.create(
+            property_id=self.property_id, user=self.user, check_in_date=self.booking_start - timedelta(days=10),
+            check_out_date=self.booking_start - timedelta(days=8), guests=1, total_price=0,
+        )
+
+    def cleanup(self):
+        Booking.objects.filter(user__username=BENCHMARK_USERNAME).delete()
+        Review.objects.filter(user__username=BENCHMARK_USERNAME).delete()
+
+    def build_request(self, scenario):
+        """(method, path, JSON body, needs authentication, expected status) for the next request."""
+        n = next(self.counter)
+        if scenario == 'list':
+            return 'GET', '/api/properties/', None, False, 200
+        if scenario == 'search':
+            return 'GET', f'/api/properties/search/?q={quote(self.search_term)}', None, False, 200
+        if scenario == 'featured':
+            return 'GET', '/api/properties/featured/', None, False, 200
+        if scenario == 'retrieve':
+            return 'GET', f'/api/properties/{self.property_id}/', None, False, 200
+        if scenario == 'book':
+            check_in = self.booking_start + timedelta(days=3 * n)
+            body = {'check_in_date': check_in.isoformat(), 'check_out_date': (check_in + timedelta(days=2)).isoformat(),
+                    'guests': 1}
+            return 'POST', f'/api/properties/{self.property_id}/book/', body, True, 201
+        if scenario == 'add_review':
+            property_id = self.review_property_ids[next(self.review_counter) % len(self.review_property_ids)]
+            return 'POST', f'/api/properties/{property_id}/add_review/', {'rating': 4, 'comment': 'Benchmark'}, True, 201
+        if scenario == 'bookings':
+            return 'GET', '/api/bookings/', None, True, 200
+        if scenario == 'login':
+            return 'POST', '/api/users/login/', {'username': BENCHMARK_USERNAME, 'password': BENCHMARK_PASSWORD}, False, 200
+        if scenario == 'login_alt':
+            return 'POST', '/api/users/login-alt/', {'username': BENCHMARK_USERNAME, 'password': BENCHMARK_PASSWORD}, False, 200
+        raise CommandError(f'Unknown scenario {scenario}')
+
+    def run_scenario(self, scenario, transport, options):
+        errors = []
+        
+        def send():
+            method, path, body, authenticated, expected = self.build_request(scenario)
+            headers = {'Authorization': f'Token {self.token}'} if authenticated else {}
+            status, content = transport.request(method, path, json.dumps(body) if body is not None else None, headers)
+            if status != expected:
+                errors.append(f'{method} {path} returned {status}: {content[:200]!r}')
+            return content
+        
+        stats = measure(send, repeat=options['repeat'], warmup=options['warmup'])
+        
+        # One traced request for query count, allocation peak and payload size
+        with CaptureQueriesContext(connection) as queries:
+            tracemalloc.start()
+            try:
+                content = send()
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        
+        rps = None
+        if options['throughput_requests']:
+            rps = throughput(send, options['throughput_requests'], options['concurrency'])
+        
+        result = {
+            'scenario': scenario,
+            'transport': transport.name,
+            **{key: round(value, 3) if isinstance(value, float) else value for key, value in stats.items()},
+            'throughput_rps': round(rps, 1) if rps is not None else None,
+            # Queries run on the server's threads are invisible here, so only the test client reports them
+            'queries': len(queries) if transport.name == 'client' else None,
+            'peak_memory_kb': round(peak / 1024, 1),
+            'response_bytes': len(content),
+            'errors': len(errors),
+        }
+        
+        line = format_stats(f'  {scenario}', stats, width=14) + f"  p99 {stats['p99_ms']:8.2f} ms"
+        if rps is not None:
+            line += f'  {rps:8.1f} req/s'
+        if result['queries'] is not None:
+            line += f"  {result['queries']:3d} queries"
+        line += f"  {result['peak_memory_kb']:8.1f} KiB peak"
+        self.stdout.write(line)
+        for error in errors[:3]:
+            self.stderr.write(f'    {error}')
+        return result
+
+    def get_meta(self, options):
+        return {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'database': connection.vendor,
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'properties': Property.objects.count() if not options['fresh'] else 1000 * options['scale'],
+            'repeat': options['repeat'],
+            'concurrency': options['concurrency'],
+            'response_cache': not options['no_response_cache'],
+            'mode': 'compare-async' if options['compare_async'] else 'scenarios',
+        }
+
+    def write_budgets(self, path, results):
+        budgets = {}
+        for result in results:
+            budget = {}
+            for metric, headroom in BUDGET_HEADROOM.items():
+                if result.get(metric) is not None:
+                    budget[metric] = round(result[metric] * headroom + BUDGET_SLACK.get(metric, 0), 1)
+            for metric in EXACT_METRICS:
+                if result.get(metric) is not None:
+                    budget[metric] = result[metric]
+            transport = BUDGET_TRANSPORTS.get(result['transport'], result['transport'])
+            budgets.setdefault(result['scenario'], {})[transport] = budget
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as output:
+            json.dump(budgets, output, indent=2, sort_keys=True)
+            output.write('\n')
+
+    def check_budgets(self, path, results, options):
+        try:
+            with open(path) as budgets_file:
+                budgets = json.load(budgets_file)
+        except FileNotFoundError:
+            raise CommandError(f'No budgets file at {path}; create one with --update-budgets')
+        
+        failures, warnings = [], []
+        # Latency, throughput and memory budgets come from the machine that wrote them
+        timings = failures if options['strict_timings'] else warnings
+        for result in results:
+            label = f"{result['scenario']}/{result['transport']}"
+            if result['errors']:
+                failures.append(f"{label}: {result['errors']} failed requests")
+            transport = BUDGET_TRANSPORTS.get(result['transport'], result['transport'])
+            budget = budgets.get(result['scenario'], {}).get(transport, {})
+            for metric in EXACT_METRICS:
+                if metric in budget and result.get(metric) is not None and result[metric] != budget[metric]:
+                    failures.append(f'{label}: {metric} {result[metric]} != budget {budget[metric]}')
+            for metric in CEILING_METRICS:
+                if metric in budget and result.get(metric) is not None and result[metric] > budget[metric]:
+                    timings.append(f'{label}: {metric} {result[metric]} > budget {budget[metric]}')
+            for metric in FLOOR_METRICS:
+                if metric in budget and result.get(metric) is not None and result[metric] < budget[metric]:
+                    timings.append(f'{label}: {metric} {result[metric]} < budget {budget[metric]}')
+        
+        for warning in warnings:
+            self.stdout.write(self.style.WARNING(f'{warning} (advisory)'))
+        if failures:
+            for failure in failures:
+                self.stderr.write(failure)
+            raise CommandError(f'{len(failures)} benchmark budget(s) not met')
+        if warnings:
+            self.stdout.write(self.style.SUCCESS(f'Query budgets met; {len(warnings)} advisory budget(s) exceeded'))
+        else:
+            self.stdout.write(self.style.SUCCESS('All benchmarks within budget'))
@@ -0,0 +1,69 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from properties import jobs
+from properties.models import ScheduledJob
+
+
+class Command(BaseCommand):
+    help = 'Run the periodic background jobs of properties.jobs (booking expiry and completion, pruning)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Run the jobs that are due and exit, e.g. from cron')
+        parser.add_argument('--job', action='append', dest='names',
+                            help='Run this job now, whether due or not, and exit (repeatable)')
+        parser.add_argument('--list', action='store_true', help='Show the schedule and counters of every job')
+        parser.add_argument('--poll', type=float, default=30,
+                            help='Longest sleep, in seconds, between checks for due jobs')
+
+    def handle(self, *args, **options):
+        jobs.sync_schedule()
+        if options['list']:
+            return self.list_jobs()
+        
+        worker = jobs.worker_name()
+        if options['names']:
+            return self.run_named(options['names'], worker)
+        if options['once']:
+            count = jobs.run_due(worker)
+            self.stdout.write(self.style.SUCCESS(f'Ran {count} due jobs'))
+            return
+        
+        # Finish the running job on SIGTERM/SIGINT instead of dying halfway through a batch
+        stopping = threading.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *args: stopping.set())
+        self.stdout.write(f'Worker {worker} running {len(jobs.JOBS)} jobs')
+        while not stopping.is_set():
+            jobs.run_due(worker)
+            # Persistent connections are not closed by a request cycle here
+            close_old_connections()
+            wait = jobs.seconds_until_due()
+            stopping.wait(options['poll'] if wait is None else min(wait, options['poll']))
+        self.stdout.write('Worker stopped')
+
+    def run_named(self, names, worker):
+        unknown = [name for name in names if name not in jobs.JOBS]
+        if unknown:
+            raise CommandError(f'Unknown jobs: {", ".join(unknown)}; known: {", ".join(sorted(jobs.JOBS))}')
+        for name in names:
+            scheduled = ScheduledJob.objects.get(name=name)
+            if not jobs.claim(scheduled, worker, force=True):
+                self.stderr.write(f'{name} is being run by {scheduled.locked_by or "another worker"}')
+                continue
+            succeeded = jobs.run(scheduled, worker)
+            scheduled.refresh_from_db()
+            message = f'{name}: {scheduled.last_items} items in {scheduled.last_duration:.3f}s'
+            self.stdout.write(self.style.SUCCESS(message) if succeeded else self.style.ERROR(message + ' (failed)'))
+
+    def list_jobs(self):
+        for scheduled in ScheduledJob.objects.filter(name__in=jobs.JOBS).order_by('name'):
+            state = 'disabled' if not scheduled.enabled else f'next run {scheduled.next_run_at:%Y-%m-%d %H:%M:%S}'
+            last = {None: 'never run', True: 'last run succeeded', False: 'last run failed'}[scheduled.last_succeeded]
+            self.stdout.write(
+                f'{scheduled.name}: every {scheduled.interval}s, {state}, {last}; '
+                f'{scheduled.run_count} runs, {scheduled.failure_count} failures, {scheduled.items_total} items'
+            )
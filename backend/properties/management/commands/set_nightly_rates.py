@@ -0,0 +1,93 @@
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from properties import cache as response_cache
+from properties.models import NightlyRate, Property
+from properties.pricing import CENTS
+
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+
+class Command(BaseCommand):
+    help = 'Set (or clear) the nightly rates of properties over a date range, e.g. for a season or weekends'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', required=True, help='First night, YYYY-MM-DD')
+        parser.add_argument('--end', required=True, help='Night after the last one, YYYY-MM-DD')
+        parser.add_argument('--property', type=int, action='append', dest='properties',
+                            help='Property id (repeatable; default: every property)')
+        parser.add_argument('--city', help='Only properties in this city')
+        parser.add_argument('--days', help='Only these weekdays, e.g. "fri,sat" for weekend rates')
+        price = parser.add_mutually_exclusive_group(required=True)
+        price.add_argument('--price', help='Price per night')
+        price.add_argument('--percent', help='Percent added to price_per_night; negative for a discount')
+        price.add_argument('--clear', action='store_true', help='Delete rates so the nights cost price_per_night')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Number of NightlyRate rows written per statement')
+
+    def handle(self, *args, **options):
+        nights = self.get_nights(options)
+        properties = Property.objects.all()
+        if options['properties']:
+            properties = properties.filter(pk__in=options['properties'])
+        if options['city']:
+            properties = properties.filter(city=options['city'])
+        
+        with transaction.atomic():
+            if options['clear']:
+                written, _ = NightlyRate.objects.filter(property__in=properties, date__in=nights).delete()
+            else:
+                written = self.write_rates(properties, nights, options)
+        
+        # Bulk writes skip the model signals that normally invalidate cached responses
+        response_cache.bump_all()
+        
+        action = 'Deleted' if options['clear'] else 'Wrote'
+        self.stdout.write(self.style.SUCCESS(f'{action} {written} nightly rates'))
+
+    def get_nights(self, options):
+        try:
+            start, end = date.fromisoformat(options['start']), date.fromisoformat(options['end'])
+        except ValueError:
+            raise CommandError('--start and --end must be dates as YYYY-MM-DD')
+        if end <= start:
+            raise CommandError('--end must be after --start')
+        
+        weekdays = set(range(7))
+        if options['days']:
+            names = [name.strip().lower()[:3] for name in options['days'].split(',')]
+            if any(name not in WEEKDAYS for name in names):
+                raise CommandError(f'--days takes comma-separated weekdays: {",".join(WEEKDAYS)}')
+            weekdays = {WEEKDAYS.index(name) for name in names}
+        
+        nights = [start + timedelta(days=i) for i in range((end - start).days)]
+        return [night for night in nights if night.weekday() in weekdays]
+
+    def write_rates(self, properties, nights, options):
+        try:
+            price = Decimal(options['price']) if options['price'] else None
+            factor = 1 + Decimal(options['percent']) / 100 if options['percent'] else None
+        except InvalidOperation:
+            raise CommandError('--price and --percent must be numbers')
+        if (price is not None and price < 0) or (factor is not None and factor < 0):
+            raise CommandError('Rates cannot be negative')
+        
+        written = 0
+        batch = []
+        for property_id, base_price in properties.values_list('id', 'price_per_night').iterator():
+            rate = price if price is not None else (base_price * factor).quantize(CENTS, rounding=ROUND_HALF_UP)
+            batch.extend(NightlyRate(property_id=property_id, date=night, price=rate) for night in nights)
+            if len(batch) >= options['batch_size']:
+                written += self.save_batch(batch)
+                batch = []
+        if batch:
+            written += self.save_batch(batch)
+        return written
+
+    def save_batch(self, batch):
+        NightlyRate.objects.bulk_create(
+            batch, update_conflicts=True, unique_fields=['property', 'date'], update_fields=['price']
+        )
+        return len(batch)
@@ -1,6 +1,70 @@
-from django.db import models
+import builtins
+from datetime import timedelta
+
+from django.db import connections, models, transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+
+from . import geo
+
+
+class PropertyQuerySet(models.QuerySet):
+    def with_related(self, host=True, images=True, reviews=True):
+        # Everything PropertySerializer touches, loaded in a fixed number of queries
+        queryset = self
+        if host:
+            queryset = queryset.select_related('host')
+        if images:
+            queryset = queryset.prefetch_related(
+                models.Prefetch('images', queryset=PropertyImage.objects.prefetch_related('variants'))
+            )
+        if reviews:
+            queryset = queryset.prefetch_related(
+                models.Prefetch('reviews', queryset=Review.objects.select_related('user'))
+            )
+        return queryset
+    
+    def available_between(self, check_in, check_out):
+        # Anti-join against the (property, date) unique index of BookedNight
+        booked = BookedNight.objects.filter(
+            property=models.OuterRef('pk'),
+            date__gte=check_in,
+            date__lt=check_out,
+        )
+        return self.exclude(models.Exists(booked))
+    
+    def with_amenities(self, names):
+        """Properties listing every one of names, looked up in the PropertyAmenity index."""
+        names = set(names)
+        matching = (
+            PropertyAmenity.objects.filter(amenity__name__in=names)
+            .values('property')
+            .annotate(matched=models.Count('amenity'))
+            .filter(matched=len(names))
+            .values('property')
+        )
+        return self.filter(pk__in=matching)
+    
+    def lock(self, pk):
+        """Fetch one property with a row lock held until the surrounding transaction ends."""
+        if connections[self.db].vendor == 'sqlite':
+            # SQLite has no row locks; a no-op UPDATE as the first statement takes the
+            # database write lock (waiting on the busy timeout) instead of failing later
+            self.filter(pk=pk).update(id=models.F('id'))
+        return self.select_for_update().get(pk=pk)
+    
+    def lock_all(self, pks):
+        """lock() for several properties; returns the ones that exist by primary key."""
+        pks = sorted(set(pks))
+        if not pks:
+            return {}
+        if connections[self.db].vendor == 'sqlite':
+            self.filter(pk__in=pks).update(id=models.F('id'))
+        # Locked in primary key order, so two batches sharing properties can't deadlock
+        return {obj.pk: obj for obj in self.select_for_update().filter(pk__in=pks).order_by('pk')}
 
 
 class Property(models.Model):
@@ -30,40 +94,168 @@ class Property(models.Model):
     room_type = models.CharField(max_length=20, choices=ROOM_TYPES)
     
     price_per_night = models.DecimalField(max_digits=10, decimal_places=2)
+    # Length-of-stay discounts in percent, see properties.pricing
+    weekly_discount = models.PositiveSmallIntegerField(default=0, validators=[MaxValueValidator(100)])
+    monthly_discount = models.PositiveSmallIntegerField(default=0, validators=[MaxValueValidator(100)])
     max_guests = models.PositiveIntegerField()
     bedrooms = models.PositiveIntegerField()
     bathrooms = models.PositiveIntegerField()
     
     amenities = models.JSONField(default=list)  # List of amenities like ['WiFi', 'Kitchen', 'Pool']
+    # Indexed copy of amenities, maintained by sync_amenities()
+    amenity_index = models.ManyToManyField(
+        'Amenity', through='PropertyAmenity', related_name='properties', editable=False
+    )
     
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    # Grid cell of (latitude, longitude), see properties.geo
+    geo_cell = models.IntegerField(null=True, blank=True, editable=False, db_index=True)
     
     host = models.ForeignKey(User, on_delete=models.CASCADE, related_name='properties')
     
     is_available = models.BooleanField(default=True)
     is_featured = models.BooleanField(default=False)
     
+    # Denormalized from Review, maintained by properties.signals
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    average_rating = models.FloatField(default=0, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = PropertyQuerySet.as_manager()
+    
     class Meta:
         verbose_name_plural = "Properties"
         ordering = ['-created_at']
+        indexes = [
+            # Default ordering and ?ordering= fields
+            models.Index(fields=['-created_at'], name='property_created_idx'),
+            models.Index(fields=['price_per_night'], name='property_price_idx'),
+            models.Index(fields=['-average_rating', '-review_count'], name='property_rating_idx'),
+            # Equality filters from filterset_fields, followed by the price range filter
+            models.Index(fields=['city', 'price_per_night'], name='property_city_price_idx'),
+            models.Index(fields=['state', 'city'], name='property_state_city_idx'),
+            models.Index(fields=['country', 'state'], name='property_country_state_idx'),
+            models.Index(fields=['property_type', 'room_type', 'price_per_night'], name='property_type_price_idx'),
+            models.Index(fields=['max_guests'], name='property_guests_idx'),
+            # featured and search only ever look at available listings
+            models.Index(
+                fields=['-created_at'], condition=models.Q(is_featured=True, is_available=True),
+                name='property_featured_idx'
+            ),
+            models.Index(
+                fields=['-created_at'], condition=models.Q(is_available=True),
+                name='property_available_idx'
+            ),
+        ]
     
     def __str__(self):
         return self.title
     
-    @property
-    def average_rating(self):
-        reviews = self.reviews.all()
-        if reviews:
-            return sum(review.rating for review in reviews) / len(reviews)
-        return 0
+    RATING_FIELDS = ['rating_sum', 'review_count', 'average_rating']
+    
+    def save(self, *args, **kwargs):
+        self.geo_cell = geo.cell_for(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geo_cell'}
+        
+        # Rating columns are only written by adjust_rating() and rebuild_rating_aggregates,
+        # so saving a stale instance must not overwrite them
+        if not self._state.adding and not kwargs.get('force_insert') and update_fields is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.RATING_FIELDS
+            ]
+        super().save(*args, **kwargs)
+    
+    @classmethod
+    def adjust_rating(cls, property_id, rating_delta, count_delta):
+        # Single UPDATE; the right-hand side sees the pre-update column values
+        new_sum = F('rating_sum') + rating_delta
+        new_count = F('review_count') + count_delta
+        cls.objects.filter(pk=property_id).update(
+            rating_sum=new_sum,
+            review_count=new_count,
+            average_rating=Coalesce(Cast(new_sum, FloatField()) / NullIf(new_count, 0), Value(0.0)),
+        )
+    
+    def sync_amenities(self):
+        """Bring this property's PropertyAmenity rows in line with its amenities list."""
+        wanted = {name for name in self.amenities or [] if isinstance(name, str)}
+        existing = dict(self.amenity_links.values_list('amenity__name', 'amenity_id'))
+        stale = [amenity_id for name, amenity_id in existing.items() if name not in wanted]
+        if stale:
+            self.amenity_links.filter(amenity_id__in=stale).delete()
+        missing = wanted - existing.keys()
+        if missing:
+            PropertyAmenity.objects.bulk_create([
+                PropertyAmenity(property=self, amenity_id=amenity_id)
+                for amenity_id in Amenity.get_ids(missing).values()
+            ], ignore_conflicts=True)
+
+
+class Amenity(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    
+    class Meta:
+        verbose_name_plural = "Amenities"
     
-    @property
-    def review_count(self):
-        return self.reviews.count()
+    def __str__(self):
+        return self.name
+    
+    @classmethod
+    def get_ids(cls, names):
+        """{name: id} for names, creating the amenities that don't exist yet."""
+        names = set(names)
+        ids = dict(cls.objects.filter(name__in=names).values_list('name', 'id'))
+        missing = names - ids.keys()
+        if missing:
+            cls.objects.bulk_create([cls(name=name) for name in missing], ignore_conflicts=True)
+            ids.update(cls.objects.filter(name__in=missing).values_list('name', 'id'))
+        return ids
+
+
+class PropertyAmenity(models.Model):
+    """
+    Amenity index: one row per amenity a property lists, so amenity filters and counts
+    are indexed lookups instead of scans of the amenities JSON. Rows are maintained by
+    Property.sync_amenities() from the Property post_save signal; rebuild_amenity_index
+    regenerates the table.
+    """
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='amenity_links')
+    amenity = models.ForeignKey(Amenity, on_delete=models.CASCADE, related_name='property_links')
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'amenity'], name='unique_property_amenity'),
+        ]
+        indexes = [
+            models.Index(fields=['amenity', 'property'], name='amenity_property_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.property_id} - {self.amenity_id}"
+
+
+class PropertySearchEntry(models.Model):
+    """
+    Read-only view of the SQLite FTS5 table of properties.search, which creates the
+    table and keeps it in sync; rowid is the property id. Unmanaged, so it only exists
+    for the ORM to join it in search queries.
+    """
+    property = models.OneToOneField(
+        Property, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid', related_name='search_entry'
+    )
+    # FTS5's hidden column named after the table, which MATCH and bm25() take
+    document = models.TextField(db_column='properties_property_fts')
+    
+    class Meta:
+        managed = False
+        db_table = 'properties_property_fts'
 
 
 class PropertyImage(models.Model):
@@ -72,11 +264,44 @@ class PropertyImage(models.Model):
     caption = models.CharField(max_length=200, blank=True)
     is_primary = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Filled in by properties.images once the variants have been generated
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    placeholder = models.CharField(max_length=100, blank=True, editable=False)
     
     def __str__(self):
         return f"{self.property.title} - {self.caption or 'Image'}"
 
 
+class ImageVariant(models.Model):
+    """A resized copy of a PropertyImage in one size and format."""
+    SIZES = [
+        ('thumbnail', 'Thumbnail'),
+        ('medium', 'Medium'),
+        ('large', 'Large'),
+    ]
+    
+    FORMATS = [
+        ('webp', 'WebP'),
+        ('jpeg', 'JPEG'),
+    ]
+    
+    image = models.ForeignKey(PropertyImage, on_delete=models.CASCADE, related_name='variants')
+    size = models.CharField(max_length=20, choices=SIZES)
+    format = models.CharField(max_length=10, choices=FORMATS)
+    file = models.ImageField(upload_to='property_images/variants/')
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['image', 'size', 'format'], name='unique_image_variant'),
+        ]
+    
+    def __str__(self):
+        return f"{self.image} - {self.size} {self.format}"
+
+
 class Review(models.Model):
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='reviews')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reviews')
@@ -88,6 +313,10 @@ class Review(models.Model):
     class Meta:
         unique_together = ['property', 'user']
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='review_created_idx'),
+            models.Index(fields=['property', '-created_at'], name='review_property_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.property.title} - {self.rating} stars"
@@ -99,7 +328,11 @@ class Booking(models.Model):
         ('confirmed', 'Confirmed'),
         ('cancelled', 'Cancelled'),
         ('completed', 'Completed'),
+        # Pending bookings not confirmed in time (see properties.jobs)
+        ('expired', 'Expired'),
     ]
+    # Bookings in these states hold their nights
+    ACTIVE_STATUSES = ['pending', 'confirmed']
     
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='bookings')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bookings')
@@ -114,10 +347,166 @@ class Booking(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['property', 'status', 'check_in_date', 'check_out_date'],
+                name='booking_property_status_idx'
+            ),
+            # Overlap checks only consider bookings that still hold their dates
+            models.Index(
+                fields=['property', 'check_in_date', 'check_out_date'],
+                condition=models.Q(status__in=['pending', 'confirmed']),
+                name='booking_active_dates_idx'
+            ),
+            # A traveller's bookings, newest first (BookingViewSet)
+            models.Index(fields=['user', '-created_at'], name='booking_user_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.property.title} - {self.check_in_date} to {self.check_out_date}"
     
-    @property
+    # `property` is shadowed by the foreign key above
+    @builtins.property
     def duration(self):
-        return (self.check_out_date - self.check_in_date).days 
\ No newline at end of file
+        return (self.check_out_date - self.check_in_date).days
+    
+    def save(self, *args, **kwargs):
+        # The post_save handlers do date arithmetic, so dates given as strings are parsed first
+        for name in ('check_in_date', 'check_out_date'):
+            setattr(self, name, self._meta.get_field(name).to_python(getattr(self, name)))
+        # The row, its BookedNight rows and the host stats are written together or not at all
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+    
+    @staticmethod
+    def night_dates(check_in_date, check_out_date):
+        return [check_in_date + timedelta(days=i) for i in range((check_out_date - check_in_date).days)]
+    
+    def sync_nights(self):
+        """Bring this booking's BookedNight rows in line with its dates, property and status."""
+        wanted = set()
+        if self.status in self.ACTIVE_STATUSES:
+            wanted = {(self.property_id, night) for night in self.night_dates(self.check_in_date, self.check_out_date)}
+        
+        existing = set(self.nights.values_list('property_id', 'date'))
+        stale = existing - wanted
+        if stale:
+            self.nights.filter(date__in=[night for _, night in stale]).delete()
+        missing = wanted - existing
+        if missing:
+            # A night already held by another booking is left alone; conflicts are rejected
+            # before saving (see BookingSerializer.validate)
+            BookedNight.objects.bulk_create(
+                [BookedNight(property_id=property_id, booking=self, date=night) for property_id, night in missing],
+                ignore_conflicts=True,
+            )
+
+
+class BookedNight(models.Model):
+    """
+    Availability index: one row per night held by a pending or confirmed booking.
+    
+    Date-range availability becomes a lookup on (property, date) instead of a range
+    scan over Booking. Rows are maintained by Booking.sync_nights() from the
+    Booking post_save signal; rebuild_availability regenerates the table.
+    """
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='booked_nights')
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='nights')
+    date = models.DateField()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'date'], name='unique_booked_night'),
+        ]
+        indexes = [
+            models.Index(fields=['date', 'property'], name='booked_night_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.property_id} - {self.date}" 
+
+
+class NightlyRate(models.Model):
+    """
+    Price of one night of a property when it differs from price_per_night (seasons,
+    weekends, events). Written ahead of time, e.g. by set_nightly_rates, so pricing a
+    stay is a range lookup on (property, date); see properties.pricing.
+    """
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='nightly_rates')
+    date = models.DateField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'date'], name='unique_nightly_rate'),
+        ]
+    
+    def __str__(self):
+        return f"{self.property_id} - {self.date}: {self.price}"
+
+
+class PropertyMonthStats(models.Model):
+    """
+    Monthly rollup of a property's bookings: nights booked in the month and the
+    revenue of those nights, for the host dashboard (see properties.stats). Rows are
+    refreshed from the Booking signals; rebuild_host_stats regenerates the table.
+    """
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='month_stats')
+    month = models.DateField()  # First day of the month
+    booked_nights = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'month'], name='unique_property_month_stats'),
+        ]
+    
+    def __str__(self):
+        return f"{self.property_id} - {self.month:%Y-%m}: {self.booked_nights} nights"
+
+
+class IdempotencyKey(models.Model):
+    """Remembers the booking created for a client-supplied Idempotency-Key header."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, null=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.key}"
+
+
+class ScheduledJob(models.Model):
+    """
+    Schedule, lease and run counters of one periodic job of properties.jobs. The
+    run_jobs worker creates the rows of registered jobs and updates them after
+    every run; /metrics reports the counters.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    interval = models.PositiveIntegerField(help_text='Seconds between runs')
+    enabled = models.BooleanField(default=True)
+    next_run_at = models.DateTimeField(default=timezone.now)
+    # Held by the worker running the job; another worker may take over once it lapses
+    locked_until = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    
+    last_started_at = models.DateTimeField(null=True, blank=True)
+    last_finished_at = models.DateTimeField(null=True, blank=True)
+    last_succeeded = models.BooleanField(null=True)
+    last_error = models.TextField(blank=True)
+    last_items = models.PositiveIntegerField(default=0)
+    last_duration = models.FloatField(default=0)
+    
+    run_count = models.PositiveIntegerField(default=0)
+    failure_count = models.PositiveIntegerField(default=0)
+    items_total = models.PositiveBigIntegerField(default=0)
+    duration_total = models.FloatField(default=0)
+    
+    def __str__(self):
+        return self.name
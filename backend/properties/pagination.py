@@ -0,0 +1,218 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination over whatever ordering the queryset already has.
+    
+    The primary key is appended as a tie-breaker, and the cursor carries the
+    ordering values of the last (or first) row on the page, so every page is a
+    single indexed range query: no COUNT(*) and no OFFSET, however deep the page.
+    Cursors are opaque base64 strings; ordering fields are assumed non-null.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.get_page_queryset(queryset, request)))
+    
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() for async views; the page query runs through the async ORM."""
+        return self.set_page([row async for row in self.get_page_queryset(queryset, request)])
+    
+    def get_page_queryset(self, queryset, request):
+        self.request = request
+        self.ordering = self.get_ordering(queryset)
+        queryset = queryset.order_by(*self.ordering)
+        
+        self.cursor = self.decode_cursor(request)
+        self.reverse = bool(self.cursor and self.cursor['reverse'])
+        if self.cursor:
+            queryset = queryset.filter(self.seek_filter(self.cursor['values'], self.cursor['reverse']))
+        if self.reverse:
+            queryset = queryset.reverse()
+        
+        # One extra row tells us whether there is another page in this direction
+        return queryset[:self.page_size + 1]
+    
+    def set_page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+        
+        self.page = rows
+        self.has_next = has_more if not self.reverse else self.cursor is not None
+        self.has_previous = self.cursor is not None if not self.reverse else has_more
+        return rows
+    
+    def get_ordering(self, queryset):
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering or [])
+        if not all(isinstance(field, str) for field in ordering):
+            raise ImproperlyConfigured('KeysetPagination only supports field-name ordering')
+        pk_name = queryset.model._meta.pk.name
+        if not any(field.lstrip('-') in ('pk', pk_name) for field in ordering):
+            # Same direction as the last field keeps (field, pk) usable as one index range
+            descending = bool(ordering) and ordering[-1].startswith('-')
+            ordering.append(f'-{pk_name}' if descending else pk_name)
+        return ordering
+    
+    def seek_filter(self, values, reverse):
+        # (a, b, c) > (x, y, z) expanded as a > x OR (a = x AND b > y) OR ..., per-field direction
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            condition |= equal & Q(**{f'{name}__{"lt" if descending else "gt"}': value})
+            equal &= Q(**{name: value})
+        return condition
+    
+    def get_row_values(self, row):
+        values = []
+        for field in self.ordering:
+            value = row
+            for attr in field.lstrip('-').split('__'):
+                value = getattr(value, attr)
+            values.append(value)
+        return values
+    
+    def make_token(self, row, reverse=False):
+        payload = json.dumps({'v': self.get_row_values(row), 'r': int(reverse)}, default=self.json_default)
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+    
+    def encode_cursor(self, row, reverse):
+        token = self.make_token(row, reverse)
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, token)
+    
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+            values, reverse = payload['v'], bool(payload['r'])
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return {'values': values, 'reverse': reverse}
+    
+    @staticmethod
+    def json_default(value):
+        # Dates and decimals round-trip as strings; the ORM converts them back when filtering
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        return str(value)
+    
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+    
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+    
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+    
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class OptionalKeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination unless keyset pagination is requested.
+    
+    Keyset pagination is used when the request carries ?cursor=... or
+    ?pagination=cursor, or when the view sets `pagination_mode = 'cursor'`.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    mode_query_param = 'pagination'
+    keyset_class = KeysetPagination
+    keyset = None
+    
+    def use_keyset(self, request, view):
+        if request.query_params.get(self.keyset_class.cursor_query_param):
+            return True
+        mode = request.query_params.get(self.mode_query_param) or getattr(view, 'pagination_mode', 'page')
+        return mode == 'cursor'
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_keyset(request, view):
+            self.keyset = self.keyset_class()
+            self.keyset.page_size = self.get_page_size(request) or self.keyset.page_size
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+    
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        paginate_queryset() for async views: the same pages, with the COUNT and the
+        page query run through the async ORM.
+        """
+        if self.use_keyset(request, view):
+            self.keyset = self.keyset_class()
+            self.keyset.page_size = self.get_page_size(request) or self.keyset.page_size
+            return await self.keyset.apaginate_queryset(queryset, request, view)
+        self.keyset = None
+        
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Paginator.count is a cached_property, so filling it in keeps Paginator from running its own COUNT
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [row async for row in self.page.object_list]
+        
+        self.request = request
+        return list(self.page)
+    
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+    
+    def get_html_context(self):
+        if self.keyset is not None:
+            return {'previous_url': self.keyset.get_previous_link(), 'next_url': self.keyset.get_next_link()}
+        return super().get_html_context()
+    
+    def to_html(self):
+        if self.keyset is not None:
+            return ''
+        return super().to_html()
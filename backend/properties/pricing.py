@@ -0,0 +1,102 @@
+"""
+Stay pricing.
+
+A stay costs the sum of its nights, less a length-of-stay discount. A night
+costs its NightlyRate row when the property has one for that date (seasonal,
+weekend and event prices, written ahead of time) and price_per_night otherwise.
+Stays of WEEKLY_NIGHTS nights or more get the property's weekly_discount percent
+off, MONTHLY_NIGHTS or more its monthly_discount.
+
+quote_stays() prices any number of stays, across any number of properties, with
+one query for all the rates involved. trip_price() is the same computation as a
+database expression, so lists can be filtered and ordered on the total price of
+the requested dates without pricing each row in Python.
+"""
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db.models import DecimalField, ExpressionWrapper, F, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Round
+
+from .models import Booking, NightlyRate
+
+WEEKLY_NIGHTS = 7
+MONTHLY_NIGHTS = 28
+# Fields of Property that quote_stays() reads
+PRICING_FIELDS = ['id', 'price_per_night', 'weekly_discount', 'monthly_discount']
+
+CENTS = Decimal('0.01')
+
+
+def discount_field(nights):
+    """Name of the Property field holding the discount for a stay of this length, or None."""
+    if nights >= MONTHLY_NIGHTS:
+        return 'monthly_discount'
+    if nights >= WEEKLY_NIGHTS:
+        return 'weekly_discount'
+    return None
+
+
+def apply_discount(subtotal, percent):
+    return (subtotal * (100 - percent) / 100).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def get_rates(stays):
+    """NightlyRate prices covering stays, as {property_id: {date: price}}."""
+    rates = defaultdict(dict)
+    if not stays:
+        return rates
+    rows = NightlyRate.objects.filter(
+        property_id__in={property_id for property_id, _, _ in stays},
+        date__gte=min(check_in for _, check_in, _ in stays),
+        date__lt=max(check_out for _, _, check_out in stays),
+    ).values_list('property_id', 'date', 'price')
+    for property_id, night, price in rows:
+        rates[property_id][night] = price
+    return rates
+
+
+def quote_stays(stays, properties):
+    """
+    Total price of each (property_id, check_in, check_out) stay, in order.
+    
+    properties maps every property id of stays to a Property with PRICING_FIELDS loaded.
+    """
+    rates = get_rates(stays)
+    totals = []
+    for property_id, check_in, check_out in stays:
+        property_obj = properties[property_id]
+        nights = Booking.night_dates(check_in, check_out)
+        prices = rates[property_id]
+        subtotal = sum((prices.get(night, property_obj.price_per_night) for night in nights), Decimal(0))
+        field = discount_field(len(nights))
+        totals.append(apply_discount(subtotal, getattr(property_obj, field) if field else 0))
+    return totals
+
+
+def quote(property_obj, check_in, check_out):
+    """Total price of one stay at property_obj."""
+    return quote_stays([(property_obj.pk, check_in, check_out)], {property_obj.pk: property_obj})[0]
+
+
+def trip_price(check_in, check_out):
+    """quote() of a stay from check_in to check_out as an expression over Property rows."""
+    nights = (check_out - check_in).days
+    output_field = DecimalField(max_digits=12, decimal_places=2)
+    # Nights with a rate cost (rate - price_per_night) more than the base price
+    rate_difference = NightlyRate.objects.filter(
+        property=OuterRef('pk'), date__gte=check_in, date__lt=check_out,
+    ).order_by().values('property').annotate(
+        difference=Sum(F('price') - OuterRef('price_per_night'), output_field=output_field)
+    ).values('difference')
+    subtotal = F('price_per_night') * Value(nights) + Coalesce(
+        Subquery(rate_difference, output_field=output_field), Value(Decimal(0)), output_field=output_field
+    )
+    field = discount_field(nights)
+    if field:
+        # A float factor: SQLite casts decimal expressions to NUMERIC, which would make
+        # this an integer division. Rounding to cents can then differ from quote() on
+        # exact half cents.
+        factor = ExpressionWrapper((Value(100.0) - F(field)) / Value(100.0), output_field=FloatField())
+        subtotal = Cast(subtotal * factor, output_field)
+    return Round(subtotal, 2, output_field=output_field)
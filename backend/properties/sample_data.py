@@ -0,0 +1,244 @@
+"""
+Synthetic data at load-testing scale for populate_sample_data.
+
+Work is split into chunks that each generate rows with their own seeded Random
+and insert them with bulk_create, so a chunk produces the same rows whichever
+process runs it. Bulk inserts skip Model.save() and the signals, so derived
+columns are filled in here (geo_cell, BookedNight rows) or rebuilt by the
+command afterwards (rating aggregates, host stats, search index, amenity index).
+"""
+import math
+import random
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+import django
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+
+from . import geo
+from .models import BookedNight, Booking, Property, Review
+
+# (city, state, country, latitude, longitude, relative demand, median nightly price)
+CITIES = [
+    ('New York', 'New York', 'USA', 40.7128, -74.0060, 100, 210),
+    ('Los Angeles', 'California', 'USA', 34.0522, -118.2437, 80, 190),
+    ('Miami', 'Florida', 'USA', 25.7617, -80.1918, 60, 180),
+    ('San Francisco', 'California', 'USA', 37.7749, -122.4194, 55, 230),
+    ('Chicago', 'Illinois', 'USA', 41.8781, -87.6298, 45, 150),
+    ('Austin', 'Texas', 'USA', 30.2672, -97.7431, 40, 160),
+    ('Seattle', 'Washington', 'USA', 47.6062, -122.3321, 35, 170),
+    ('Nashville', 'Tennessee', 'USA', 36.1627, -86.7816, 30, 175),
+    ('New Orleans', 'Louisiana', 'USA', 29.9511, -90.0715, 28, 165),
+    ('Denver', 'Colorado', 'USA', 39.7392, -104.9903, 25, 145),
+    ('Honolulu', 'Hawaii', 'USA', 21.3069, -157.8583, 22, 260),
+    ('Aspen', 'Colorado', 'USA', 39.1911, -106.8175, 10, 420),
+    ('Napa', 'California', 'USA', 38.2975, -122.2869, 8, 310),
+    ('London', 'England', 'UK', 51.5074, -0.1278, 90, 170),
+    ('Paris', 'Ile-de-France', 'France', 48.8566, 2.3522, 85, 160),
+    ('Barcelona', 'Catalonia', 'Spain', 41.3874, 2.1686, 50, 120),
+    ('Rome', 'Lazio', 'Italy', 41.9028, 12.4964, 45, 115),
+    ('Lisbon', 'Lisbon', 'Portugal', 38.7223, -9.1393, 35, 95),
+    ('Berlin', 'Berlin', 'Germany', 52.5200, 13.4050, 35, 90),
+    ('Amsterdam', 'North Holland', 'Netherlands', 52.3676, 4.9041, 30, 175),
+    ('Tokyo', 'Tokyo', 'Japan', 35.6762, 139.6503, 60, 130),
+    ('Sydney', 'New South Wales', 'Australia', -33.8688, 151.2093, 30, 170),
+    ('Mexico City', 'CDMX', 'Mexico', 19.4326, -99.1332, 30, 70),
+    ('Cape Town', 'Western Cape', 'South Africa', -33.9249, 18.4241, 15, 85),
+]
+
+# (property type, weight, price factor, bedroom range)
+PROPERTY_TYPES = [
+    ('apartment', 45, 0.9, (0, 3)),
+    ('condo', 20, 1.0, (1, 3)),
+    ('house', 22, 1.3, (2, 5)),
+    ('villa', 5, 2.5, (3, 7)),
+    ('cabin', 8, 1.1, (1, 4)),
+]
+
+ROOM_TYPES = [('entire', 70, 1.0), ('private', 25, 0.55), ('shared', 5, 0.3)]
+
+AMENITIES = [
+    'WiFi', 'Kitchen', 'Air Conditioning', 'Heating', 'Washer', 'Dryer', 'Free Parking', 'Pool',
+    'Hot Tub', 'Gym', 'TV', 'Workspace', 'Fireplace', 'BBQ', 'Garden', 'Beach Access', 'City View',
+    'Mountain View', 'Pets Allowed', 'Self Check-in', 'Elevator', 'Balcony',
+]
+
+ADJECTIVES = ['Cozy', 'Sunny', 'Modern', 'Charming', 'Spacious', 'Quiet', 'Stylish', 'Rustic', 'Bright', 'Elegant']
+FEATURES = ['with a View', 'near Downtown', 'by the Park', 'with Terrace', 'close to the Beach', 'in the Old Town']
+STREETS = ['Main St', 'Oak Ave', 'Park Rd', 'Market St', 'Harbor Way', 'Hill Rd', 'Lake Dr', 'Elm St', 'River Rd']
+
+REVIEW_COMMENTS = {
+    5: ['Amazing place! Highly recommended.', 'Exceeded our expectations!', 'Perfect stay, would book again.'],
+    4: ['Great location and clean property.', 'Comfortable stay, minor issues.', 'Beautiful views.'],
+    3: ['Decent for the price.', 'Okay stay, a bit noisy at night.'],
+    2: ['Not as described.', 'Needs maintenance.'],
+    1: ['Would not recommend.'],
+}
+# Ratings skew high on every listing site
+RATING_WEIGHTS = [2, 3, 10, 35, 50]
+
+# Bookings are spread over this window around today
+BOOKING_WINDOW_PAST_DAYS = 365
+BOOKING_WINDOW_FUTURE_DAYS = 180
+
+_user_ids = None
+
+
+def chunk_rng(seed, kind, start):
+    return random.Random(f'{seed}:{kind}:{start}')
+
+
+def init_worker(user_ids):
+    """ProcessPoolExecutor initializer: make sure Django is set up and keep the user pool."""
+    global _user_ids
+    django.setup()
+    _user_ids = user_ids
+
+
+def generate_users(seed, start, count, prefix, password_hash, batch_size):
+    rng = chunk_rng(seed, 'users', start)
+    first_names = ['Alex', 'Sam', 'Jordan', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Jamie', 'Avery', 'Quinn']
+    last_names = ['Smith', 'Garcia', 'Chen', 'Müller', 'Rossi', 'Silva', 'Kim', 'Novak', 'Dubois', 'Khan']
+    users = []
+    for n in range(start, start + count):
+        first_name, last_name = rng.choice(first_names), rng.choice(last_names)
+        users.append(User(
+            username=f'{prefix}{n}',
+            email=f'{prefix}{n}@example.com',
+            first_name=first_name,
+            last_name=last_name,
+            password=password_hash,
+        ))
+    User.objects.bulk_create(users, batch_size=batch_size, ignore_conflicts=True)
+    return {'users': count}
+
+
+def generate_properties(seed, start, count, batch_size):
+    rng = chunk_rng(seed, 'properties', start)
+    city_weights = [city[5] for city in CITIES]
+    type_weights = [property_type[1] for property_type in PROPERTY_TYPES]
+    room_weights = [room_type[1] for room_type in ROOM_TYPES]
+    
+    properties = []
+    for _ in range(count):
+        city, state, country, lat, lng, _demand, median_price = rng.choices(CITIES, city_weights)[0]
+        property_type, _weight, type_factor, (min_bedrooms, max_bedrooms) = rng.choices(PROPERTY_TYPES, type_weights)[0]
+        room_type, _weight, room_factor = rng.choices(ROOM_TYPES, room_weights)[0]
+        bedrooms = rng.randint(min_bedrooms, max_bedrooms)
+        
+        # Nightly prices are roughly log-normal around the city's median
+        price = median_price * type_factor * room_factor * (1 + 0.25 * bedrooms) * rng.lognormvariate(0, 0.35)
+        latitude = round(lat + rng.gauss(0, 0.04), 6)
+        longitude = round(lng + rng.gauss(0, 0.05), 6)
+        
+        properties.append(Property(
+            title=f'{rng.choice(ADJECTIVES)} {property_type.title()} {rng.choice(FEATURES)}',
+            description=f'{bedrooms or "Studio"} bedroom {property_type} in {city}. ' * 3,
+            address=f'{rng.randint(1, 9999)} {rng.choice(STREETS)}',
+            city=city,
+            state=state,
+            country=country,
+            zip_code=f'{rng.randint(10000, 99999)}',
+            property_type=property_type,
+            room_type=room_type,
+            price_per_night=Decimal(max(25, round(price))).quantize(Decimal('0.01')),
+            max_guests=max(1, bedrooms * 2 + rng.randint(-1, 2)),
+            bedrooms=bedrooms,
+            bathrooms=max(1, math.ceil(bedrooms / 2) + rng.randint(0, 1)),
+            amenities=rng.sample(AMENITIES, rng.randint(3, 10)),
+            latitude=Decimal(str(latitude)),
+            longitude=Decimal(str(longitude)),
+            geo_cell=geo.cell_for(latitude, longitude),
+            host_id=rng.choice(_user_ids),
+            is_available=rng.random() < 0.95,
+            is_featured=rng.random() < 0.05,
+        ))
+    Property.objects.bulk_create(properties, batch_size=batch_size)
+    return {'properties': count}
+
+
+def generate_bookings(seed, first_id, last_id, count, batch_size):
+    """
+    Create up to `count` non-overlapping bookings (and some reviews) across properties
+    first_id..last_id; stays that would overlap already booked nights are skipped.
+    """
+    rng = chunk_rng(seed, 'bookings', first_id)
+    properties = list(
+        Property.objects.filter(id__range=(first_id, last_id))
+        .order_by('id').values_list('id', 'price_per_night', 'max_guests')
+    )
+    if not properties or not count:
+        return {'bookings': 0, 'reviews': 0, 'booked nights': 0}
+    
+    # A few listings take most of the bookings
+    popularity = [rng.paretovariate(1.5) for _ in properties]
+    per_property = [0] * len(properties)
+    for index in rng.choices(range(len(properties)), popularity, k=count):
+        per_property[index] += 1
+    
+    today = date.today()
+    window = BOOKING_WINDOW_PAST_DAYS + BOOKING_WINDOW_FUTURE_DAYS
+    # Nights already booked on these properties; stays over them are skipped rather than
+    # inserted with their BookedNight rows silently dropped by the unique constraint
+    booked = defaultdict(set)
+    for property_id, night in BookedNight.objects.filter(
+        property__gte=first_id, property__lte=last_id, date__gte=today - timedelta(days=BOOKING_WINDOW_PAST_DAYS)
+    ).values_list('property_id', 'date'):
+        booked[property_id].add(night)
+    bookings, reviews = [], []
+    for (property_id, price, max_guests), booking_count in zip(properties, per_property):
+        if not booking_count:
+            continue
+        reviewers = set()
+        # Walk forward through time so a property's bookings never overlap
+        day = today - timedelta(days=BOOKING_WINDOW_PAST_DAYS)
+        mean_gap = max(0.5, window / booking_count - 4)
+        for _ in range(booking_count):
+            day += timedelta(days=int(rng.expovariate(1 / mean_gap)))
+            nights = min(28, 1 + int(rng.expovariate(1 / 3)))
+            check_out = day + timedelta(days=nights)
+            user_id = rng.choice(_user_ids)
+            if not booked[property_id].isdisjoint(Booking.night_dates(day, check_out)):
+                day = check_out
+                continue
+            
+            if check_out <= today:
+                status = 'cancelled' if rng.random() < 0.05 else 'completed'
+            else:
+                status = rng.choices(['confirmed', 'pending', 'cancelled'], [80, 15, 5])[0]
+            bookings.append(Booking(
+                property_id=property_id,
+                user_id=user_id,
+                check_in_date=day,
+                check_out_date=check_out,
+                guests=rng.randint(1, max_guests),
+                total_price=price * nights,
+                status=status,
+            ))
+            if status == 'completed' and user_id not in reviewers and rng.random() < 0.6:
+                reviewers.add(user_id)
+                rating = rng.choices(range(1, 6), RATING_WEIGHTS)[0]
+                reviews.append(Review(
+                    property_id=property_id,
+                    user_id=user_id,
+                    rating=rating,
+                    comment=rng.choice(REVIEW_COMMENTS[rating]),
+                ))
+            day = check_out
+    
+    with transaction.atomic():
+        Booking.objects.bulk_create(bookings, batch_size=batch_size)
+        Review.objects.bulk_create(reviews, batch_size=batch_size, ignore_conflicts=True)
+        nights = 0
+        if connection.features.can_return_rows_from_bulk_insert:
+            # Booking ids came back from the insert, so the availability index can be filled here
+            booked_nights = [
+                BookedNight(property_id=booking.property_id, booking_id=booking.pk, date=night)
+                for booking in bookings if booking.status in Booking.ACTIVE_STATUSES
+                for night in Booking.night_dates(booking.check_in_date, booking.check_out_date)
+            ]
+            BookedNight.objects.bulk_create(booked_nights, batch_size=batch_size, ignore_conflicts=True)
+            nights = len(booked_nights)
+    return {'bookings': len(bookings), 'reviews': len(reviews), 'booked nights': nights}
@@ -0,0 +1,180 @@
+"""
+Full-text search over property listings.
+
+PostgreSQL uses a GIN expression index over a weighted tsvector and ranks with
+ts_rank. SQLite uses an FTS5 table (rowid = property id) that properties.signals
+keeps in sync and ranks with bm25. Any other backend, or SQLite built without
+FTS5, falls back to the icontains filter the API used before.
+"""
+import re
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.db.models import BooleanField, F, FloatField, Func, Lookup, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Property, PropertySearchEntry
+
+SEARCH_FIELDS = ['title', 'description', 'address', 'city', 'state', 'country']
+
+FTS_TABLE = PropertySearchEntry._meta.db_table
+GIN_INDEX = 'property_search_gin'
+
+# Relative importance of each field, in SEARCH_FIELDS order
+SQLITE_WEIGHTS = [10.0, 1.0, 2.0, 5.0, 3.0, 3.0]
+POSTGRES_WEIGHTS = ['A', 'C', 'C', 'B', 'B', 'B']
+
+_fts_ready = {}
+
+
+@PropertySearchEntry._meta.get_field('document').register_lookup
+class Match(Lookup):
+    """`search_entry__document__match=...` renders an FTS5 MATCH."""
+    lookup_name = 'match'
+    
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+def _postgres_document():
+    table = Property._meta.db_table
+    parts = [
+        f"setweight(to_tsvector('english'::regconfig, coalesce(\"{table}\".\"{field}\", '')), '{weight}')"
+        for field, weight in zip(SEARCH_FIELDS, POSTGRES_WEIGHTS)
+    ]
+    return '(' + ' || '.join(parts) + ')'
+
+
+def get_backend(using='default'):
+    vendor = connections[using].vendor
+    if vendor == 'postgresql':
+        return 'postgresql'
+    if vendor == 'sqlite' and _sqlite_fts_ready(using):
+        return 'sqlite'
+    return 'fallback'
+
+
+async def aget_backend(using='default'):
+    # The SQLite FTS5 probe is a query, run once per process; after that this never leaves the event loop
+    if connections[using].vendor == 'sqlite' and using not in _fts_ready:
+        await sync_to_async(_sqlite_fts_ready)(using)
+    return get_backend(using)
+
+
+def _sqlite_fts_ready(using):
+    if using not in _fts_ready:
+        with connections[using].cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            _fts_ready[using] = cursor.fetchone() is not None
+    return _fts_ready[using]
+
+
+def ensure_search_index(using='default'):
+    """Create the FTS5 table or GIN index if it is missing. Safe to call repeatedly."""
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {GIN_INDEX} ON {Property._meta.db_table} '
+                f'USING GIN ({_postgres_document()})'
+            )
+        return True
+    
+    if connection.vendor != 'sqlite':
+        return False
+    
+    _fts_ready.pop(using, None)
+    if _sqlite_fts_ready(using):
+        return True
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                f"{', '.join(SEARCH_FIELDS)}, tokenize = 'porter unicode61')"
+            )
+        except Exception:
+            # SQLite compiled without FTS5
+            _fts_ready[using] = False
+            return False
+    _fts_ready[using] = True
+    rebuild_search_index(using)
+    return True
+
+
+def rebuild_search_index(using='default'):
+    """Repopulate the SQLite FTS5 table from Property; returns the number of rows indexed."""
+    if get_backend(using) != 'sqlite':
+        return 0
+    columns = ', '.join(SEARCH_FIELDS)
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, {columns}) '
+            f'SELECT id, {columns} FROM {Property._meta.db_table}'
+        )
+        return cursor.rowcount
+
+
+def index_property(property_obj, using='default'):
+    if get_backend(using) != 'sqlite':
+        return
+    placeholders = ', '.join(['%s'] * (len(SEARCH_FIELDS) + 1))
+    values = [property_obj.pk] + [getattr(property_obj, field) or '' for field in SEARCH_FIELDS]
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [property_obj.pk])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(SEARCH_FIELDS)}) VALUES ({placeholders})",
+            values
+        )
+
+
+def unindex_property(property_id, using='default'):
+    if get_backend(using) != 'sqlite':
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [property_id])
+
+
+def fts5_query(query):
+    # Quote every term so user input cannot use FTS5 operators; each term is a prefix match
+    terms = re.findall(r'\w+', query)
+    return ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+
+def search_properties(queryset, query):
+    """
+    Filter queryset to listings matching query and annotate `search_rank`
+    (higher is more relevant). Ordering is left to the caller.
+    """
+    backend = get_backend(queryset.db)
+    
+    if backend == 'postgresql':
+        tsquery = "websearch_to_tsquery('english'::regconfig, %s)"
+        return queryset.filter(
+            RawSQL(f'{_postgres_document()} @@ {tsquery}', [query], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(f'ts_rank({_postgres_document()}, {tsquery})', [query], output_field=FloatField())
+        )
+    
+    if backend == 'sqlite':
+        match = fts5_query(query)
+        if not match:
+            return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+        # Joined rather than a correlated subquery, so MATCH runs once and bm25() ranks the joined rows
+        return queryset.filter(search_entry__document__match=match).annotate(
+            # bm25() is lower-is-better; negate it so both backends sort rank descending
+            search_rank=-Func(
+                F('search_entry__document'), *map(Value, SQLITE_WEIGHTS), function='bm25', output_field=FloatField()
+            )
+        )
+    
+    return icontains_search(queryset, query).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+def icontains_search(queryset, query):
+    condition = Q()
+    for field in SEARCH_FIELDS:
+        condition |= Q(**{f'{field}__icontains': query})
+    return queryset.filter(condition)
@@ -1,21 +1,67 @@
+from django.db import transaction
 from rest_framework import serializers
-from .models import Property, PropertyImage, Review, Booking
+from airbnb_clone.serializers import TimedSerializerMixin
+from . import pricing
+from .models import Property, PropertyImage, Review, Booking, BookedNight
 from django.contrib.auth.models import User
 
 
-class UserSerializer(serializers.ModelSerializer):
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets for model serializers.
+    
+    Accepts `fields` and `expand` keyword arguments. `fields` limits the output to the
+    named fields; otherwise `Meta.default_fields` (when set) is used and `expand` adds
+    any other declared field on top of it. Unknown names are ignored.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        expand = kwargs.pop('expand', None)
+        super().__init__(*args, **kwargs)
+        
+        selected = self.selected_fields(fields, expand)
+        if selected is not None:
+            for field_name in set(self.fields) - selected:
+                self.fields.pop(field_name)
+    
+    @classmethod
+    def selected_fields(cls, fields=None, expand=None):
+        """Names that will be rendered, or None when every declared field is."""
+        if fields:
+            return set(fields) | set(expand or ())
+        default_fields = getattr(cls.Meta, 'default_fields', None)
+        if default_fields is None:
+            return None
+        return set(default_fields) | set(expand or ())
+
+
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'first_name', 'last_name', 'email']
 
 
-class PropertyImageSerializer(serializers.ModelSerializer):
+class PropertyImageSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    srcset = serializers.SerializerMethodField()
+    
     class Meta:
         model = PropertyImage
-        fields = ['id', 'image', 'caption', 'is_primary']
+        fields = ['id', 'image', 'caption', 'is_primary', 'width', 'height', 'placeholder', 'srcset']
+    
+    def get_srcset(self, obj):
+        # {'webp': '<url> 320w, <url> 768w, ...', 'jpeg': ...}; empty until the variants exist
+        request = self.context.get('request')
+        candidates = {}
+        for variant in sorted(obj.variants.all(), key=lambda variant: variant.width):
+            url = variant.file.url
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            candidates.setdefault(variant.format, []).append(f'{url} {variant.width}w')
+        return {fmt: ', '.join(entries) for fmt, entries in candidates.items()}
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     
     class Meta:
@@ -24,43 +70,71 @@ class ReviewSerializer(serializers.ModelSerializer):
         read_only_fields = ['user']
 
 
-class PropertySerializer(serializers.ModelSerializer):
+class PropertySerializer(DynamicFieldsMixin, TimedSerializerMixin, serializers.ModelSerializer):
     host = UserSerializer(read_only=True)
     images = PropertyImageSerializer(many=True, read_only=True)
     reviews = ReviewSerializer(many=True, read_only=True)
     average_rating = serializers.ReadOnlyField()
     review_count = serializers.ReadOnlyField()
     primary_image = serializers.SerializerMethodField()
+    # Only present when the queryset is annotated (?lat=&lng= searches)
+    distance_km = serializers.FloatField(read_only=True)
+    # Total price of the stay, only present for ?check_in=&check_out= lists
+    trip_price = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
     
     class Meta:
         model = Property
         fields = [
             'id', 'title', 'description', 'address', 'city', 'state', 'country', 'zip_code',
-            'property_type', 'room_type', 'price_per_night', 'max_guests', 'bedrooms', 'bathrooms',
-            'amenities', 'latitude', 'longitude', 'host', 'is_available', 'is_featured',
-            'created_at', 'updated_at', 'images', 'reviews', 'average_rating', 'review_count',
-            'primary_image'
+            'property_type', 'room_type', 'price_per_night', 'weekly_discount', 'monthly_discount',
+            'max_guests', 'bedrooms', 'bathrooms', 'amenities', 'latitude', 'longitude', 'host',
+            'is_available', 'is_featured', 'created_at', 'updated_at', 'images', 'reviews',
+            'average_rating', 'review_count', 'primary_image', 'distance_km', 'trip_price'
         ]
         read_only_fields = ['host', 'created_at', 'updated_at']
     
     def get_primary_image(self, obj):
-        primary_image = obj.images.filter(is_primary=True).first()
+        # Work on obj.images.all() so a prefetched queryset is reused instead of re-queried
+        images = sorted(obj.images.all(), key=lambda image: image.pk)
+        primary_image = next((image for image in images if image.is_primary), None)
         if primary_image:
-            return PropertyImageSerializer(primary_image).data
+            return PropertyImageSerializer(primary_image, context=self.context).data
         # Return first image if no primary image is set
-        first_image = obj.images.first()
-        if first_image:
-            return PropertyImageSerializer(first_image).data
+        if images:
+            return PropertyImageSerializer(images[0], context=self.context).data
         return None
 
 
-class PropertyCreateSerializer(serializers.ModelSerializer):
+class PropertyListSerializer(PropertySerializer):
+    """Compact card representation for collection endpoints; nested data is opt-in via `expand`."""
+    
+    class Meta(PropertySerializer.Meta):
+        default_fields = [
+            'id', 'title', 'city', 'state', 'country', 'property_type', 'room_type',
+            'price_per_night', 'max_guests', 'bedrooms', 'bathrooms', 'latitude', 'longitude',
+            'is_available', 'is_featured', 'created_at', 'average_rating', 'review_count',
+            'primary_image', 'distance_km', 'trip_price'
+        ]
+
+
+class BookingPropertySerializer(PropertySerializer):
+    """The booked property as a card: no description, host, image list or reviews."""
+    
+    class Meta(PropertySerializer.Meta):
+        default_fields = [
+            'id', 'title', 'address', 'city', 'state', 'country', 'property_type', 'room_type',
+            'price_per_night', 'average_rating', 'review_count', 'primary_image'
+        ]
+
+
+class PropertyCreateSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Property
         fields = [
             'title', 'description', 'address', 'city', 'state', 'country', 'zip_code',
-            'property_type', 'room_type', 'price_per_night', 'max_guests', 'bedrooms', 'bathrooms',
-            'amenities', 'latitude', 'longitude', 'is_available', 'is_featured'
+            'property_type', 'room_type', 'price_per_night', 'weekly_discount', 'monthly_discount',
+            'max_guests', 'bedrooms', 'bathrooms', 'amenities', 'latitude', 'longitude',
+            'is_available', 'is_featured'
         ]
     
     def create(self, validated_data):
@@ -68,8 +142,8 @@ class PropertyCreateSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class BookingSerializer(serializers.ModelSerializer):
-    property = PropertySerializer(read_only=True)
+class BookingSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    property = BookingPropertySerializer(read_only=True)
     user = UserSerializer(read_only=True)
     property_id = serializers.IntegerField(write_only=True)
     
@@ -83,19 +157,42 @@ class BookingSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         property_id = validated_data.pop('property_id')
-        try:
-            property_obj = Property.objects.get(id=property_id)
-        except Property.DoesNotExist:
-            raise serializers.ValidationError("Property not found")
-        
-        validated_data['property'] = property_obj
-        validated_data['user'] = self.context['request'].user
         
-        # Calculate total price
-        duration = (validated_data['check_out_date'] - validated_data['check_in_date']).days
-        validated_data['total_price'] = property_obj.price_per_night * duration
+        # validate() checked availability without a lock; check again while holding one
+        with transaction.atomic():
+            try:
+                property_obj = Property.objects.lock(property_id)
+            except Property.DoesNotExist:
+                raise serializers.ValidationError("Property not found")
+            
+            if self.nights_taken(property_id, validated_data['check_in_date'], validated_data['check_out_date']):
+                raise serializers.ValidationError("Property is not available for the selected dates")
+            
+            validated_data['property'] = property_obj
+            validated_data['user'] = self.context['request'].user
+            
+            validated_data['total_price'] = pricing.quote(
+                property_obj, validated_data['check_in_date'], validated_data['check_out_date']
+            )
+            
+            booking = super().create(validated_data)
+            
+            # The unique (property, date) index is the last line of defence: if any night
+            # went to someone else the booking is rolled back
+            if booking.nights.count() != booking.duration:
+                raise serializers.ValidationError("Property is not available for the selected dates")
         
-        return super().create(validated_data)
+        return booking
+    
+    def nights_taken(self, property_id, check_in_date, check_out_date):
+        booked_nights = BookedNight.objects.filter(
+            property_id=property_id,
+            date__gte=check_in_date,
+            date__lt=check_out_date
+        )
+        if self.instance is not None:
+            booked_nights = booked_nights.exclude(booking=self.instance)
+        return booked_nights.exists()
     
     def validate(self, data):
         # Check if check_out_date is after check_in_date
@@ -105,17 +202,36 @@ class BookingSerializer(serializers.ModelSerializer):
         # Check if property is available for the selected dates
         property_id = data.get('property_id')
         if property_id:
-            try:
-                property_obj = Property.objects.get(id=property_id)
-                conflicting_bookings = Booking.objects.filter(
-                    property=property_obj,
-                    status__in=['pending', 'confirmed'],
-                    check_in_date__lt=data['check_out_date'],
-                    check_out_date__gt=data['check_in_date']
-                )
-                if conflicting_bookings.exists():
-                    raise serializers.ValidationError("Property is not available for the selected dates")
-            except Property.DoesNotExist:
+            if not Property.objects.filter(id=property_id).exists():
                 raise serializers.ValidationError("Property not found")
+            if self.nights_taken(property_id, data['check_in_date'], data['check_out_date']):
+                raise serializers.ValidationError("Property is not available for the selected dates")
         
-        return data 
\ No newline at end of file
+        return data
+
+
+class BulkBookingItemSerializer(serializers.Serializer):
+    """One item of a batch (see properties.bulk); availability is checked for the whole batch at once."""
+    property_id = serializers.IntegerField()
+    check_in_date = serializers.DateField()
+    check_out_date = serializers.DateField()
+    guests = serializers.IntegerField(min_value=1)
+    special_requests = serializers.CharField(required=False, allow_blank=True, default='')
+    
+    def validate(self, data):
+        if data['check_out_date'] <= data['check_in_date']:
+            raise serializers.ValidationError("Check-out date must be after check-in date")
+        return data
+
+
+class BookingSummarySerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """A booking without its nested property and user, for batch results."""
+    property_id = serializers.IntegerField(read_only=True)
+    
+    class Meta:
+        model = Booking
+        fields = [
+            'id', 'property_id', 'check_in_date', 'check_out_date', 'guests', 'total_price', 'status',
+            'special_requests', 'created_at', 'duration'
+        ]
+        read_only_fields = fields
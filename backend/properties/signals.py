@@ -0,0 +1,147 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import cache as response_cache
+from . import images
+from . import search
+from . import stats
+from .models import Booking, ImageVariant, NightlyRate, Property, PropertyImage, Review
+
+
+@receiver(post_init, sender=Review)
+def remember_review_rating(sender, instance, **kwargs):
+    # Read through __dict__ so deferred fields are not loaded just to track them
+    instance._saved_rating = instance.__dict__.get('rating') if instance.pk else None
+    instance._saved_property_id = instance.__dict__.get('property_id')
+
+
+@receiver(pre_save, sender=Review)
+@receiver(pre_delete, sender=Review)
+def load_deferred_review_rating(sender, instance, using, **kwargs):
+    # A row loaded with rating or property deferred has nothing tracked yet;
+    # read the stored values before the write so the adjustment is a change, not a new review
+    if instance._state.adding or None not in (instance._saved_rating, instance._saved_property_id):
+        return
+    stored = sender._base_manager.using(using).filter(pk=instance.pk).values_list('rating', 'property_id').first()
+    if stored:
+        instance._saved_rating, instance._saved_property_id = stored
+        # Fill in whatever is still deferred, without overwriting assigned values, so later
+        # receivers need no reload (which would fail once the row is deleted)
+        instance.__dict__.setdefault('rating', stored[0])
+        instance.__dict__.setdefault('property_id', stored[1])
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, created, **kwargs):
+    previous_rating = instance._saved_rating
+    previous_property_id = instance._saved_property_id
+    
+    if created:
+        Property.adjust_rating(instance.property_id, instance.rating, 1)
+    elif previous_property_id != instance.property_id:
+        Property.adjust_rating(previous_property_id, -previous_rating, -1)
+        Property.adjust_rating(instance.property_id, instance.rating, 1)
+    elif previous_rating != instance.rating:
+        Property.adjust_rating(instance.property_id, instance.rating - previous_rating, 0)
+    
+    instance._saved_rating = instance.rating
+    instance._saved_property_id = instance.property_id
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, **kwargs):
+    rating = instance._saved_rating if instance._saved_rating is not None else instance.rating
+    Property.adjust_rating(instance._saved_property_id or instance.property_id, -rating, -1)
+
+
+@receiver(post_save, sender=Booking)
+def sync_booked_nights(sender, instance, **kwargs):
+    instance.sync_nights()
+
+
+@receiver(post_init, sender=Booking)
+def remember_booking_stay(sender, instance, **kwargs):
+    fields = [instance.__dict__.get(name) for name in ('property_id', 'check_in_date', 'check_out_date')]
+    instance._saved_stay = fields if instance.pk and None not in fields else None
+
+
+@receiver(post_save, sender=Booking)
+def refresh_host_stats_on_save(sender, instance, **kwargs):
+    # The months the booking left (moved dates or property) are recomputed too
+    keys = stats.stats_keys([instance])
+    if instance._saved_stay is not None:
+        property_id, check_in_date, check_out_date = instance._saved_stay
+        keys |= {(property_id, month) for month in stats.booking_months(check_in_date, check_out_date)}
+    stats.refresh(keys)
+    instance._saved_stay = [instance.property_id, instance.check_in_date, instance.check_out_date]
+
+
+@receiver(post_delete, sender=Booking)
+def refresh_host_stats_on_delete(sender, instance, **kwargs):
+    stats.refresh(stats.stats_keys([instance]))
+
+
+@receiver(post_init, sender=Property)
+def remember_property_amenities(sender, instance, **kwargs):
+    instance._saved_amenities = instance.__dict__.get('amenities') if instance.pk else None
+
+
+@receiver(post_save, sender=Property)
+def sync_amenity_index(sender, instance, created, **kwargs):
+    # Unknown previous amenities (new or deferred) count as changed
+    if created or instance._saved_amenities is None or instance._saved_amenities != instance.amenities:
+        instance.sync_amenities()
+    instance._saved_amenities = instance.amenities
+
+
+@receiver(post_save, sender=Property)
+def index_property_for_search(sender, instance, using, **kwargs):
+    search.index_property(instance, using=using)
+
+
+@receiver(post_delete, sender=Property)
+def unindex_property_for_search(sender, instance, using, **kwargs):
+    search.unindex_property(instance.pk, using=using)
+
+
+@receiver(post_init, sender=PropertyImage)
+def remember_image_file(sender, instance, **kwargs):
+    image = instance.__dict__.get('image') if instance.pk else None
+    instance._saved_image_name = None if image is None else str(image)
+
+
+@receiver(post_save, sender=PropertyImage)
+def generate_image_variants(sender, instance, created, **kwargs):
+    name = instance.image.name or ''
+    if name and (created or (instance._saved_image_name is not None and name != instance._saved_image_name)):
+        images.schedule(instance.pk)
+    instance._saved_image_name = name
+
+
+@receiver(post_delete, sender=ImageVariant)
+def delete_variant_file(sender, instance, **kwargs):
+    # Only once committed, so a rolled back regeneration keeps the files its rows point to
+    transaction.on_commit(lambda: instance.file.delete(save=False))
+
+
+# Connected to post_migrate for this app only, in PropertiesConfig.ready (apps.py)
+def create_search_index(sender, using, **kwargs):
+    search.ensure_search_index(using=using)
+
+
+@receiver([post_save, post_delete], sender=Property)
+def invalidate_cached_property(sender, instance, **kwargs):
+    response_cache.bump_property(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=PropertyImage)
+@receiver([post_save, post_delete], sender=Review)
+@receiver([post_save, post_delete], sender=NightlyRate)
+def invalidate_cached_property_children(sender, instance, **kwargs):
+    response_cache.bump_property(instance.property_id)
+
+
+@receiver([post_save, post_delete], sender=Booking)
+def invalidate_cached_availability(sender, instance, **kwargs):
+    response_cache.bump_availability()
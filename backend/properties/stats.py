@@ -0,0 +1,196 @@
+"""
+Host dashboard statistics.
+
+PropertyMonthStats rolls bookings up per property and calendar month: the nights
+booked (pending, confirmed or completed bookings) and their revenue, a booking's
+total_price spread evenly over its nights, so a stay across a month boundary
+counts in both months. The rows a booking touches are recomputed whenever it is
+saved or deleted (properties.signals, bulk.create_bookings), so get_host_stats()
+reads one row per property and month however long the booking history is:
+
+- one query for the host's properties
+- one for their PropertyMonthStats rows
+- one GROUP BY on TruncMonth for the reviews written in each month
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.db.models import Avg, Count
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Booking, Property, PropertyMonthStats, Review
+from .pricing import CENTS
+
+# Bookings whose nights count as booked
+STATS_STATUSES = ['pending', 'confirmed', 'completed']
+
+ZERO = Decimal('0.00')
+
+
+def get_max_months():
+    return getattr(settings, 'HOST_STATS_MAX_MONTHS', 24)
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(month):
+    return (month.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def month_range(start, end):
+    """First days of the months from start to end, both included."""
+    months = []
+    month = month_start(start)
+    while month <= end:
+        months.append(month)
+        month = next_month(month)
+    return months
+
+
+def booking_months(check_in_date, check_out_date):
+    """Months holding at least one night of a stay."""
+    if check_out_date <= check_in_date:
+        return []
+    return month_range(check_in_date, check_out_date - timedelta(days=1))
+
+
+def stats_keys(bookings):
+    """(property_id, month) keys of the rollup rows that Booking instances count in."""
+    return {
+        (booking.property_id, month)
+        for booking in bookings
+        for month in booking_months(booking.check_in_date, booking.check_out_date)
+    }
+
+
+def booking_rows(queryset):
+    return queryset.filter(status__in=STATS_STATUSES).values_list(
+        'property_id', 'check_in_date', 'check_out_date', 'total_price'
+    )
+
+
+def accumulate(rows, keys=None):
+    """{(property_id, month): [nights, revenue]} of booking_rows(), only for keys if given."""
+    totals = defaultdict(lambda: [0, Decimal(0)])
+    for property_id, check_in_date, check_out_date, total_price in rows:
+        nights = (check_out_date - check_in_date).days
+        for month in booking_months(check_in_date, check_out_date):
+            if keys is not None and (property_id, month) not in keys:
+                continue
+            month_nights = (min(check_out_date, next_month(month)) - max(check_in_date, month)).days
+            totals[property_id, month][0] += month_nights
+            totals[property_id, month][1] += total_price * month_nights / nights
+    return totals
+
+
+def stats_objects(totals):
+    return [
+        PropertyMonthStats(
+            property_id=property_id, month=month, booked_nights=nights,
+            revenue=revenue.quantize(CENTS, rounding=ROUND_HALF_UP),
+        )
+        for (property_id, month), (nights, revenue) in totals.items()
+    ]
+
+
+def refresh(keys):
+    """Recompute the PropertyMonthStats rows of (property_id, month) keys from the bookings."""
+    keys = set(keys)
+    if not keys:
+        return
+    months = [month for _, month in keys]
+    rows = booking_rows(Booking.objects.filter(
+        property_id__in={property_id for property_id, _ in keys},
+        check_in_date__lt=next_month(max(months)),
+        check_out_date__gt=min(months),
+    ))
+    totals = accumulate(rows, keys)
+    # Months left without bookings are written as zeros
+    for key in keys:
+        totals.setdefault(key, [0, Decimal(0)])
+    PropertyMonthStats.objects.bulk_create(
+        stats_objects(totals), update_conflicts=True,
+        unique_fields=['property', 'month'], update_fields=['booked_nights', 'revenue'],
+    )
+
+
+def month_datetime(month):
+    return timezone.make_aware(datetime.combine(month, time.min))
+
+
+def occupancy(nights, days):
+    return round(nights / days, 4) if days else 0.0
+
+
+def get_host_stats(host, start, end, property_ids=None):
+    """
+    Booked nights, occupancy rate, revenue and average rating of host's properties
+    for each month from start to end (first days of months, both included).
+    """
+    months = month_range(start, end)
+    properties = Property.objects.filter(host=host)
+    if property_ids:
+        properties = properties.filter(pk__in=property_ids)
+    
+    stats = {
+        (property_id, month): (nights, revenue)
+        for property_id, month, nights, revenue in PropertyMonthStats.objects.filter(
+            property__in=properties.values('pk'), month__gte=start, month__lte=end
+        ).values_list('property_id', 'month', 'booked_nights', 'revenue')
+    }
+    ratings = {
+        (row['property_id'], timezone.localtime(row['month']).date()): (row['average'], row['count'])
+        for row in Review.objects.filter(
+            property__in=properties.values('pk'),
+            created_at__gte=month_datetime(start), created_at__lt=month_datetime(next_month(end)),
+        ).annotate(month=TruncMonth('created_at')).values('property_id', 'month').annotate(
+            average=Avg('rating'), count=Count('pk')
+        ).order_by()
+    }
+    
+    days = {month: (next_month(month) - month).days for month in months}
+    period_days = sum(days.values())
+    results = []
+    total_nights, total_revenue = 0, ZERO
+    for property_obj in properties.order_by('id').only('id', 'title', 'average_rating', 'review_count'):
+        month_rows = []
+        property_nights, property_revenue = 0, ZERO
+        for month in months:
+            nights, revenue = stats.get((property_obj.pk, month), (0, ZERO))
+            average, count = ratings.get((property_obj.pk, month), (None, 0))
+            month_rows.append({
+                'month': f'{month:%Y-%m}',
+                'booked_nights': nights,
+                'occupancy_rate': occupancy(nights, days[month]),
+                'revenue': str(revenue),
+                'average_rating': round(average, 2) if average is not None else None,
+                'review_count': count,
+            })
+            property_nights += nights
+            property_revenue += revenue
+        results.append({
+            'id': property_obj.pk,
+            'title': property_obj.title,
+            'average_rating': property_obj.average_rating,
+            'review_count': property_obj.review_count,
+            'booked_nights': property_nights,
+            'occupancy_rate': occupancy(property_nights, period_days),
+            'revenue': str(property_revenue),
+            'months': month_rows,
+        })
+        total_nights += property_nights
+        total_revenue += property_revenue
+    
+    return {
+        'start': f'{start:%Y-%m}',
+        'end': f'{end:%Y-%m}',
+        'booked_nights': total_nights,
+        'occupancy_rate': occupancy(total_nights, period_days * len(results)),
+        'revenue': str(total_revenue),
+        'properties': results,
+    }
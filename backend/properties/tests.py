@@ -0,0 +1,249 @@
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from . import cache as response_cache
+from .models import BookedNight, Booking, Property, PropertyImage, Review
+
+
+def create_property(host, number, **fields):
+    data = {
+        'title': f'Property {number}', 'description': 'A quiet place', 'address': f'{number} Main St',
+        'city': 'Miami', 'state': 'Florida', 'country': 'USA', 'zip_code': '33101',
+        'property_type': 'house', 'room_type': 'entire', 'price_per_night': Decimal('100.00'),
+        'max_guests': 4, 'bedrooms': 2, 'bathrooms': 1, 'amenities': ['WiFi'],
+        'latitude': Decimal('25.76'), 'longitude': Decimal('-80.19'), 'host': host,
+    }
+    data.update(fields)
+    return Property.objects.create(**data)
+
+
+class QueryCountTests(TestCase):
+    """Collection endpoints load their relations in a fixed number of queries."""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = User.objects.create_user('host')
+        cls.guests = [User.objects.create_user(f'guest{number}') for number in range(3)]
+        cls.properties = []
+        for number in range(6):
+            property_obj = create_property(cls.host, number)
+            PropertyImage.objects.create(property=property_obj, image='property_images/a.jpg', is_primary=True)
+            PropertyImage.objects.create(property=property_obj, image='property_images/b.jpg')
+            for guest in cls.guests:
+                Review.objects.create(property=property_obj, user=guest, rating=4, comment='Nice')
+            cls.properties.append(property_obj)
+        
+        check_in = date.today() + timedelta(days=30)
+        for number, property_obj in enumerate(cls.properties):
+            Booking.objects.create(
+                property=property_obj, user=cls.guests[0], guests=2, total_price=Decimal('200.00'),
+                check_in_date=check_in + timedelta(days=3 * number),
+                check_out_date=check_in + timedelta(days=3 * number + 2),
+            )
+    
+    def setUp(self):
+        caches['api'].clear()
+        self.client = APIClient()
+    
+    def get(self, url, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+    
+    def test_property_list(self):
+        # COUNT, properties, images, image variants
+        response = self.get('/api/properties/', 4)
+        self.assertEqual(response.data['count'], len(self.properties))
+        # The host is joined and the reviews add one query, not one per property
+        self.get('/api/properties/?expand=host,images,reviews', 5)
+    
+    def test_property_detail(self):
+        # Property with host, images, variants, reviews with their users
+        response = self.get(f'/api/properties/{self.properties[0].pk}/', 4)
+        self.assertEqual(len(response.data['reviews']), len(self.guests))
+    
+    def test_booking_list(self):
+        self.client.force_authenticate(self.guests[0])
+        # COUNT, bookings with property and user, images, image variants
+        response = self.get('/api/bookings/', 4)
+        self.assertEqual(response.data['count'], len(self.properties))
+    
+    def test_review_list(self):
+        # COUNT, reviews with their users
+        response = self.get('/api/reviews/', 2)
+        self.assertEqual(response.data['count'], len(self.properties) * len(self.guests))
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        host = User.objects.create_user('host')
+        cls.in_description = create_property(host, 1, description='Two minutes from the beach')
+        cls.in_title = create_property(host, 2, title='Beach house')
+        cls.in_city = create_property(host, 3, city='Beachwood')
+        create_property(host, 4, title='Mountain cabin')
+    
+    def setUp(self):
+        caches['api'].clear()
+    
+    def test_ranked_by_field_weight(self):
+        # Title outranks city, city outranks description; unmatched listings are left out
+        expected = [self.in_title.pk, self.in_city.pk, self.in_description.pk]
+        for url in ('/api/properties/search/?q=beach', '/api/properties/?search=beach'):
+            response = self.client.get(url)
+            self.assertEqual([result['id'] for result in response.data['results']], expected, url)
+    
+    def test_search_inside_subqueries(self):
+        # Facets filter on the searched queryset as a subquery
+        response = self.client.get('/api/properties/facets/?search=beach')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 3)
+
+
+class CacheVersionTests(TestCase):
+    def setUp(self):
+        caches['api'].clear()
+        self.property = create_property(User.objects.create_user('host'), 1)
+        self.names = [response_cache.CATALOG, f'property:{self.property.pk}']
+        self.versions = response_cache.get_versions(self.names)
+    
+    def test_bumped_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.property.title = 'Renamed'
+            self.property.save()
+            self.assertEqual(response_cache.get_versions(self.names), self.versions)
+        new_versions = response_cache.get_versions(self.names)
+        for name in self.names:
+            self.assertGreater(new_versions[name], self.versions[name])
+    
+    def test_not_bumped_on_rollback(self):
+        with self.captureOnCommitCallbacks(execute=True), self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.property.title = 'Renamed'
+                self.property.save()
+                raise RuntimeError
+        self.assertEqual(response_cache.get_versions(self.names), self.versions)
+
+
+class BookingSaveTests(TestCase):
+    def setUp(self):
+        self.guest = User.objects.create_user('guest')
+        self.property = create_property(User.objects.create_user('host'), 1)
+    
+    def test_string_dates_are_indexed(self):
+        booking = Booking.objects.create(
+            property=self.property, user=self.guest, guests=2, total_price=Decimal('300.00'),
+            check_in_date='2029-01-01', check_out_date='2029-01-04',
+        )
+        self.assertEqual(booking.check_in_date, date(2029, 1, 1))
+        self.assertEqual(
+            sorted(booking.nights.values_list('date', flat=True)),
+            [date(2029, 1, 1), date(2029, 1, 2), date(2029, 1, 3)],
+        )
+        self.assertEqual(self.property.month_stats.get(month=date(2029, 1, 1)).booked_nights, 3)
+    
+    def test_failed_night_sync_leaves_no_booking(self):
+        with mock.patch.object(Booking, 'sync_nights', side_effect=RuntimeError), self.assertRaises(RuntimeError):
+            Booking.objects.create(
+                property=self.property, user=self.guest, guests=2, total_price=Decimal('300.00'),
+                check_in_date=date(2029, 1, 1), check_out_date=date(2029, 1, 4),
+            )
+        self.assertFalse(Booking.objects.exists())
+
+
+class ReviewRatingTests(TestCase):
+    def setUp(self):
+        self.guest = User.objects.create_user('guest')
+        self.property = create_property(User.objects.create_user('host'), 1)
+        self.review = Review.objects.create(property=self.property, user=self.guest, rating=4, comment='Nice')
+    
+    def assertRating(self, rating_sum, review_count):
+        self.property.refresh_from_db()
+        self.assertEqual((self.property.review_count, self.property.rating_sum), (review_count, rating_sum))
+    
+    def test_saving_with_deferred_rating_keeps_totals(self):
+        review = Review.objects.only('id', 'comment', 'property_id').get(pk=self.review.pk)
+        review.comment = 'Very nice'
+        review.save()
+        self.assertRating(4, 1)
+    
+    def test_changing_deferred_rating_adjusts_by_difference(self):
+        review = Review.objects.only('id', 'comment').get(pk=self.review.pk)
+        review.rating = 2
+        review.save()
+        self.assertRating(2, 1)
+    
+    def test_deleting_deferred_review_removes_its_rating(self):
+        Review.objects.only('id').get(pk=self.review.pk).delete()
+        self.assertRating(0, 0)
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """Booking requests racing for the same nights, from threads with their own connections."""
+    
+    def setUp(self):
+        self.guests = [User.objects.create_user(f'guest{number}') for number in range(8)]
+        self.property = create_property(User.objects.create_user('host'), 1)
+        self.check_in = date.today() + timedelta(days=60)
+    
+    def stay(self, nights=3):
+        return {
+            'property_id': self.property.pk, 'guests': 2,
+            'check_in_date': self.check_in.isoformat(),
+            'check_out_date': (self.check_in + timedelta(days=nights)).isoformat(),
+        }
+    
+    def post(self, user, data, key=None):
+        client = APIClient()
+        client.force_authenticate(user)
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        try:
+            return client.post('/api/bookings/', data, format='json', **headers).status_code
+        finally:
+            connection.close()
+    
+    def post_concurrently(self, requests):
+        barrier = threading.Barrier(len(requests))
+        statuses = []
+        
+        def worker(user, data, key):
+            barrier.wait()
+            try:
+                statuses.append(self.post(user, data, key))
+            except Exception as exc:
+                statuses.append(type(exc).__name__)
+        
+        threads = [threading.Thread(target=worker, args=request) for request in requests]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sorted(statuses, key=str)
+    
+    def test_one_booking_per_night(self):
+        statuses = self.post_concurrently([(guest, self.stay(), None) for guest in self.guests])
+        self.assertEqual(statuses, [201] + [400] * (len(self.guests) - 1))
+        self.assertEqual(Booking.objects.filter(property=self.property).count(), 1)
+        nights = BookedNight.objects.filter(property=self.property)
+        self.assertEqual(nights.count(), 3)
+        self.assertEqual(nights.values('date').distinct().count(), 3)
+    
+    def test_idempotent_retries(self):
+        guest = self.guests[0]
+        statuses = self.post_concurrently([(guest, self.stay(), 'retry-1')] * len(self.guests))
+        self.assertEqual(statuses, [200] * (len(self.guests) - 1) + [201])
+        self.assertEqual(Booking.objects.filter(property=self.property).count(), 1)
+        
+        self.assertEqual(self.post(guest, self.stay(), 'retry-1'), 200)
+        # The same key with a different payload
+        self.assertEqual(self.post(guest, self.stay(nights=2), 'retry-1'), 409)
+        self.assertEqual(BookedNight.objects.filter(property=self.property).count(), 3)
@@ -1,5 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import PropertyViewSet, PropertyImageViewSet, ReviewViewSet, BookingViewSet
 
 router = DefaultRouter()
@@ -10,4 +11,9 @@ router.register(r'bookings', BookingViewSet, basename='booking')
 
 urlpatterns = [
     path('', include(router.urls)),
+    # Async (ASGI) read path, see properties.async_views
+    path('async/properties/', async_views.property_list, name='async-property-list'),
+    path('async/properties/featured/', async_views.featured, name='async-property-featured'),
+    path('async/properties/search/', async_views.search, name='async-property-search'),
+    path('async/properties/<int:pk>/', async_views.property_detail, name='async-property-detail'),
 ] 
\ No newline at end of file
@@ -1,33 +1,188 @@
+import functools
+import hashlib
+import json
+from datetime import date
+
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticatedOrReadOnly, IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Avg
-from .models import Property, PropertyImage, Review, Booking
+from django.db import IntegrityError, transaction
+from django.db.models import Q, Avg, Prefetch
+from airbnb_clone.db import ReplicaReadMixin
+from . import bulk
+from . import cache as response_cache
+from . import geo
+from . import pricing
+from . import stats
+from .export import BOOKING_FIELDS, PROPERTY_FIELDS, CSVRenderer, NDJSONRenderer, streaming_response
+from .facets import get_facets
+from .filters import FullTextSearchFilter, PropertyOrderingFilter
+from .models import Property, PropertyImage, Review, Booking, IdempotencyKey
+from .search import search_properties
 from .serializers import (
-    PropertySerializer, PropertyCreateSerializer, PropertyImageSerializer,
-    ReviewSerializer, BookingSerializer
+    DynamicFieldsMixin, PropertySerializer, PropertyListSerializer, PropertyCreateSerializer,
+    PropertyImageSerializer, ReviewSerializer, BookingSerializer, BookingSummarySerializer
 )
 
 
-class PropertyViewSet(viewsets.ModelViewSet):
+def cached_response(action):
+    """Serve anonymous GETs of a view action from properties.cache (see PropertyViewSet.finalize_response)."""
+    @functools.wraps(action)
+    def wrapper(self, request, *args, **kwargs):
+        self.response_cache_key = None
+        if request.method == 'GET' and not request.user.is_authenticated:
+            property_id = kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+            key = response_cache.make_key(request, self.action, property_id)
+            entry = response_cache.get(key)
+            if entry is not None:
+                return response_cache.to_response(request, entry)
+            self.response_cache_key = key
+        return action(self, request, *args, **kwargs)
+    return wrapper
+
+
+def get_batch(request):
+    """The 'items' list of a batch request body (see properties.bulk)."""
+    items = request.data.get('items') if isinstance(request.data, dict) else None
+    if not isinstance(items, list) or not items:
+        raise ValidationError({'items': ['Expected a non-empty list of items.']})
+    max_items = bulk.get_max_items()
+    if len(items) > max_items:
+        raise ValidationError({'items': [f'At most {max_items} items per request.']})
+    return items
+
+
+def get_query_list(request, name):
+    # Accept both ?fields=a,b and ?fields=a&fields=b
+    values = []
+    for value in request.query_params.getlist(name):
+        values.extend(part.strip() for part in value.split(',') if part.strip())
+    return values
+
+
+class IdempotentBookingMixin:
+    """
+    Booking creation shared by PropertyViewSet.book and BookingViewSet.create.
+    
+    When the client sends an Idempotency-Key header, the first request claims the key
+    in the same transaction that creates the booking; retries with the same key and
+    payload get that booking back (200) instead of a conflict or a duplicate.
+    """
+    
+    def create_booking(self, request, data):
+        serializer = BookingSerializer(data=data, context=self.get_serializer_context())
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            serializer.is_valid(raise_exception=True)
+            serializer.save(user=request.user)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        
+        request_hash = hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+        existing = self.get_idempotency_record(request.user, key)
+        if existing is not None:
+            return self.replay_booking(existing, request_hash)
+        
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(user=request.user, key=key, request_hash=request_hash)
+                serializer.is_valid(raise_exception=True)
+                record.booking = serializer.save(user=request.user)
+                record.save(update_fields=['booking'])
+        except IntegrityError:
+            # A concurrent request with the same key committed first
+            existing = self.get_idempotency_record(request.user, key)
+            if existing is None:
+                raise
+            return self.replay_booking(existing, request_hash)
+        
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    
+    def get_idempotency_record(self, user, key):
+        return IdempotencyKey.objects.filter(user=user, key=key).select_related('booking').first()
+    
+    def replay_booking(self, record, request_hash):
+        if record.request_hash != request_hash:
+            return Response(
+                {'error': 'Idempotency-Key was already used with a different request'},
+                status=status.HTTP_409_CONFLICT
+            )
+        serializer = BookingSerializer(record.booking, context=self.get_serializer_context())
+        return Response(serializer.data, status=status.HTTP_200_OK, headers={'Idempotent-Replayed': 'true'})
+
+
+class PropertyViewSet(ReplicaReadMixin, IdempotentBookingMixin, viewsets.ModelViewSet):
     queryset = Property.objects.all()
     serializer_class = PropertySerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, PropertyOrderingFilter, FullTextSearchFilter]
     filterset_fields = ['property_type', 'room_type', 'city', 'state', 'country', 'is_available', 'is_featured']
     search_fields = ['title', 'description', 'address', 'city', 'state', 'country']
-    ordering_fields = ['price_per_night', 'created_at', 'average_rating']
+    ordering_fields = ['price_per_night', 'created_at', 'average_rating', 'trip_price']
+    # Only orderable when the request computes them (see PropertyOrderingFilter)
+    annotated_ordering_fields = ['trip_price']
     ordering = ['-created_at']
+    # The host dashboard reads PropertyMonthStats right after bookings change; a lagging replica would undercount
+    primary_actions = ['host_stats']
+    
+    @cached_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @cached_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+    
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        key = getattr(self, 'response_cache_key', None)
+        if key and response.status_code == status.HTTP_200_OK and isinstance(response, Response):
+            response.render()
+            entry = response_cache.store(key, response)
+            if response_cache.not_modified(request, entry['etag']):
+                return response_cache.to_response(request, entry)
+            response['ETag'] = entry['etag']
+        return response
     
     def get_serializer_class(self):
         if self.action == 'create':
             return PropertyCreateSerializer
+        if self.action in ['list', 'featured', 'search']:
+            return PropertyListSerializer
         return PropertySerializer
     
+    def get_query_list(self, name):
+        return get_query_list(self.request, name)
+    
+    def get_selected_fields(self):
+        serializer_class = self.get_serializer_class()
+        if self.request.method != 'GET' or not issubclass(serializer_class, DynamicFieldsMixin):
+            return None
+        return serializer_class.selected_fields(self.get_query_list('fields'), self.get_query_list('expand'))
+    
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method == 'GET' and issubclass(self.get_serializer_class(), DynamicFieldsMixin):
+            kwargs.setdefault('fields', self.get_query_list('fields'))
+            kwargs.setdefault('expand', self.get_query_list('expand'))
+        return super().get_serializer(*args, **kwargs)
+    
+    def get_base_queryset(self):
+        # Only join/prefetch the relations the response will actually render
+        selected = self.get_selected_fields()
+        
+        def wants(*names):
+            return selected is None or any(name in selected for name in names)
+        
+        return Property.objects.with_related(
+            host=wants('host'),
+            images=wants('images', 'primary_image'),
+            reviews=wants('reviews'),
+        )
+    
     def get_queryset(self):
-        queryset = Property.objects.all()
+        queryset = self.get_base_queryset()
         
         # Filter by price range
         min_price = self.request.query_params.get('min_price')
@@ -42,25 +197,89 @@ class PropertyViewSet(viewsets.ModelViewSet):
         if guests:
             queryset = queryset.filter(max_guests__gte=guests)
         
-        # Filter by amenities
+        # Filter by amenities: properties with all of them
         amenities = self.request.query_params.getlist('amenities')
         if amenities:
-            for amenity in amenities:
-                queryset = queryset.filter(amenities__contains=[amenity])
+            queryset = queryset.with_amenities(amenities)
         
-        # Filter by date availability
-        check_in = self.request.query_params.get('check_in')
-        check_out = self.request.query_params.get('check_out')
-        if check_in and check_out:
-            conflicting_bookings = Booking.objects.filter(
-                status__in=['pending', 'confirmed'],
-                check_in_date__lt=check_out,
-                check_out_date__gt=check_in
-            ).values_list('property_id', flat=True)
-            queryset = queryset.exclude(id__in=conflicting_bookings)
+        # Filter by date availability, and by the total price of the stay computed in the database
+        min_trip_price = self.request.query_params.get('min_trip_price')
+        max_trip_price = self.request.query_params.get('max_trip_price')
+        stay = self.get_stay()
+        if stay:
+            check_in, check_out = stay
+            queryset = queryset.available_between(check_in, check_out).annotate(
+                trip_price=pricing.trip_price(check_in, check_out)
+            )
+            if min_trip_price:
+                queryset = queryset.filter(trip_price__gte=self.parse_floats('min_trip_price', min_trip_price, 1)[0])
+            if max_trip_price:
+                queryset = queryset.filter(trip_price__lte=self.parse_floats('max_trip_price', max_trip_price, 1)[0])
+        elif min_trip_price or max_trip_price:
+            raise ValidationError({'check_in/check_out': 'Required to filter by trip price'})
+        
+        # Filter by location: bounding box and/or distance from a point
+        bbox = self.request.query_params.get('bbox')
+        if bbox:
+            min_lng, min_lat, max_lng, max_lat = self.parse_floats('bbox', bbox, 4)
+            queryset = queryset.filter(geo.bbox_filter(min_lat, min_lng, max_lat, max_lng))
+        
+        point = self.get_point()
+        if point:
+            lat, lng, radius_km = point
+            queryset = queryset.filter(geo.bbox_filter(*geo.bbox_around(lat, lng, radius_km)))
+            queryset = queryset.annotate(distance_km=geo.distance_km(lat, lng)).filter(distance_km__lte=radius_km)
         
         return queryset
     
+    def get_stay(self):
+        check_in = self.request.query_params.get('check_in')
+        check_out = self.request.query_params.get('check_out')
+        if not (check_in and check_out):
+            return None
+        try:
+            check_in, check_out = date.fromisoformat(check_in), date.fromisoformat(check_out)
+        except ValueError:
+            raise ValidationError({'check_in/check_out': 'Expected dates as YYYY-MM-DD'})
+        if check_out <= check_in:
+            raise ValidationError({'check_in/check_out': 'Check-out date must be after check-in date'})
+        return check_in, check_out
+    
+    def get_month(self, name):
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            return date.fromisoformat(f'{value}-01')
+        except ValueError:
+            raise ValidationError({name: 'Expected a month as YYYY-MM'})
+    
+    def get_point(self):
+        lat = self.request.query_params.get('lat')
+        lng = self.request.query_params.get('lng')
+        if not (lat and lng):
+            return None
+        lat, lng = self.parse_floats('lat/lng', f'{lat},{lng}', 2)
+        radius_km, = self.parse_floats('radius_km', self.request.query_params.get('radius_km', '25'), 1)
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180) or radius_km <= 0:
+            raise ValidationError({'lat/lng': 'Coordinates or radius out of range'})
+        return lat, lng, radius_km
+    
+    def parse_floats(self, name, value, count):
+        try:
+            numbers = [float(part) for part in value.split(',')]
+        except ValueError:
+            numbers = []
+        if len(numbers) != count:
+            raise ValidationError({name: f'Expected {count} comma-separated numbers'})
+        return numbers
+    
+    def get_default_ordering(self):
+        # Nearest first when searching around a point
+        if self.get_point():
+            return ['distance_km', *self.ordering]
+        return self.ordering
+    
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def add_review(self, request, pk=None):
         property_obj = self.get_object()
@@ -74,45 +293,87 @@ class PropertyViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def book(self, request, pk=None):
         property_obj = self.get_object()
-        serializer = BookingSerializer(data=request.data)
-        
-        if serializer.is_valid():
-            serializer.save(property=property_obj, user=request.user)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = request.data.copy()
+        data['property_id'] = property_obj.pk
+        return self.create_booking(request, data)
+    
+    @action(detail=False, methods=['post'], permission_classes=[AllowAny])
+    def availability(self, request):
+        # POST because a batch of date ranges doesn't fit in a query string; nothing is booked
+        results = []
+        for result in bulk.check_availability(get_batch(request)):
+            item = {'index': result['index'], 'available': 'errors' not in result}
+            if item['available']:
+                item['total_price'] = str(result['total_price'])
+            else:
+                item['errors'] = result['errors']
+            results.append(item)
+        return Response({'results': results})
+    
+    @action(detail=False, methods=['get'])
+    @cached_response
+    def facets(self, request):
+        # Counts for the list's filters, from aggregate queries; no listing is loaded
+        return Response(get_facets(self.filter_queryset(self.get_queryset())))
+    
+    @action(detail=False, methods=['get'], url_path='host-stats', permission_classes=[IsAuthenticated])
+    def host_stats(self, request):
+        # Monthly occupancy, revenue and ratings of the caller's listings, from the rollup table
+        end = self.get_month('end') or stats.month_start(date.today())
+        # The twelve months up to end by default
+        start = self.get_month('start') or stats.next_month(end.replace(year=end.year - 1))
+        months = (end.year - start.year) * 12 + end.month - start.month + 1
+        if not 0 < months <= stats.get_max_months():
+            raise ValidationError({'start/end': f'Expected between 1 and {stats.get_max_months()} months'})
+        try:
+            property_ids = [int(value) for value in self.get_query_list('property')]
+        except ValueError:
+            raise ValidationError({'property': 'Expected property ids'})
+        return Response(stats.get_host_stats(request.user, start, end, property_ids))
     
     @action(detail=False, methods=['get'])
+    @cached_response
     def featured(self, request):
-        featured_properties = Property.objects.filter(is_featured=True, is_available=True)
+        featured_properties = self.get_base_queryset().filter(is_featured=True, is_available=True)
         serializer = self.get_serializer(featured_properties, many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @cached_response
     def search(self, request):
         query = request.query_params.get('q', '')
         if not query:
             return Response({'error': 'Search query is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        properties = Property.objects.filter(
-            Q(title__icontains=query) |
-            Q(description__icontains=query) |
-            Q(city__icontains=query) |
-            Q(state__icontains=query) |
-            Q(country__icontains=query)
-        ).filter(is_available=True)
+        properties = search_properties(
+            self.get_base_queryset().filter(is_available=True), query
+        ).order_by('-search_rank', '-created_at')
         
+        page = self.paginate_queryset(properties)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
         serializer = self.get_serializer(properties, many=True)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated],
+            renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        # Same filters as list, unpaginated and streamed; ?format=csv for CSV. Rows are read
+        # after dispatch returns, so pin the database (replica) chosen for this request.
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = queryset.using(queryset.db)
+        return streaming_response(request, queryset, PROPERTY_FIELDS, request.accepted_renderer.format, 'properties')
 
 
 class PropertyImageViewSet(viewsets.ModelViewSet):
-    queryset = PropertyImage.objects.all()
+    queryset = PropertyImage.objects.prefetch_related('variants')
     serializer_class = PropertyImageSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
-    queryset = Review.objects.all()
+class ReviewViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
+    queryset = Review.objects.select_related('user')
     serializer_class = ReviewSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     
@@ -120,12 +381,72 @@ class ReviewViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
 
 
-class BookingViewSet(viewsets.ModelViewSet):
+class BookingViewSet(IdempotentBookingMixin, viewsets.ModelViewSet):
     serializer_class = BookingSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Booking.objects.filter(user=self.request.user)
+        # Served by the (user, -created_at) index, newest first
+        return self.filter_bookings(Booking.objects.filter(user=self.request.user))
+    
+    def filter_bookings(self, queryset):
+        """Load what BookingSerializer renders and apply the status/start/end query filters."""
+        queryset = queryset.select_related('property', 'user').prefetch_related(
+            Prefetch('property__images', queryset=PropertyImage.objects.prefetch_related('variants'))
+        )
+        
+        statuses = get_query_list(self.request, 'status')
+        if statuses:
+            unknown = set(statuses) - {value for value, _ in Booking.STATUS_CHOICES}
+            if unknown:
+                raise ValidationError({'status': f'Unknown statuses: {", ".join(sorted(unknown))}'})
+            queryset = queryset.filter(status__in=statuses)
+        
+        # Stays with at least one night from start to end
+        start, end = self.get_date('start'), self.get_date('end')
+        if start and end and end < start:
+            raise ValidationError({'start/end': 'End date must not be before start date'})
+        if start:
+            queryset = queryset.filter(check_out_date__gt=start)
+        if end:
+            queryset = queryset.filter(check_in_date__lte=end)
+        return queryset
+    
+    def get_date(self, name):
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise ValidationError({name: 'Expected a date as YYYY-MM-DD'})
+    
+    def create(self, request, *args, **kwargs):
+        return self.create_booking(request, request.data)
+    
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request):
+        """Book a batch of items at once; available ones are booked, the rest come back with their errors."""
+        results = []
+        created = 0
+        for result in bulk.create_bookings(request.user, get_batch(request)):
+            if 'booking' in result:
+                created += 1
+                results.append({
+                    'index': result['index'], 'status': 'created',
+                    'booking': BookingSummarySerializer(result['booking']).data,
+                })
+            else:
+                results.append({'index': result['index'], 'status': 'rejected', 'errors': result['errors']})
+        return Response(
+            {'created': created, 'rejected': len(results) - created, 'results': results},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+    
+    @action(detail=False, methods=['get'], renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        return streaming_response(request, queryset, BOOKING_FIELDS, request.accepted_renderer.format, 'bookings')
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user) 
\ No newline at end of file
@@ -0,0 +1,103 @@
+"""
+Token authentication with a cache in front of the token table.
+
+CachedTokenAuthentication keeps token -> (user, issued at) in the Django cache
+named by settings.AUTH_TOKEN_CACHE_ALIAS for AUTH_TOKEN_CACHE_TIMEOUT seconds, so
+an authenticated request costs one cache read instead of a joined token/user
+query (and nothing like the password hash BasicAuthentication ran per request).
+Entries are evicted when the token is deleted (logout, rotation, expiry) or the
+user is saved (see users.signals). With a per-process cache such as locmem, other
+processes can keep accepting a revoked token until their entry times out; point
+the alias at a shared cache like Redis to make revocation immediate.
+
+Tokens expire AUTH_TOKEN_EXPIRY seconds after they are issued (None: never), and
+logging in with a token older than AUTH_TOKEN_ROTATE_AFTER issues a fresh one.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+KEY_PREFIX = 'auth:token'
+
+
+def get_cache():
+    return caches[getattr(settings, 'AUTH_TOKEN_CACHE_ALIAS', 'default')]
+
+
+def cache_key(key):
+    # Tokens are credentials; keep them out of shared cache key listings
+    return f'{KEY_PREFIX}:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+def evict(key):
+    get_cache().delete(cache_key(key))
+
+
+def get_expiry():
+    seconds = getattr(settings, 'AUTH_TOKEN_EXPIRY', None)
+    return timedelta(seconds=seconds) if seconds else None
+
+
+def expires_at(token):
+    expiry = get_expiry()
+    return token.created + expiry if expiry else None
+
+
+def is_expired(created):
+    expiry = get_expiry()
+    return expiry is not None and created + expiry <= timezone.now()
+
+
+def issue_token(user):
+    """The user's token for a successful login, replaced when it expired or is due for rotation."""
+    token, created = Token.objects.get_or_create(user=user)
+    rotate_after = getattr(settings, 'AUTH_TOKEN_ROTATE_AFTER', None)
+    if not created and (is_expired(token.created) or (
+        rotate_after and token.created + timedelta(seconds=rotate_after) <= timezone.now()
+    )):
+        token = rotate_token(user)
+    return token
+
+
+def rotate_token(user):
+    """Revoke the user's token and issue a new one."""
+    with transaction.atomic():
+        Token.objects.filter(user=user).delete()
+        return Token.objects.create(user=user)
+
+
+def revoke_token(user):
+    """Delete the user's token; returns whether there was one."""
+    deleted, _ = Token.objects.filter(user=user).delete()
+    return bool(deleted)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication ('Authorization: Token <key>') with cached lookups and optional expiry."""
+    
+    def authenticate_credentials(self, key):
+        cache = get_cache()
+        entry = cache.get(cache_key(key))
+        if entry is None:
+            user, token = super().authenticate_credentials(key)
+            entry = {'user': user, 'created': token.created}
+            timeout = getattr(settings, 'AUTH_TOKEN_CACHE_TIMEOUT', 300)
+            token_expires_at = expires_at(token)
+            if token_expires_at is not None:
+                # Never keep a token in the cache past its expiry
+                timeout = min(timeout, max(1, int((token_expires_at - timezone.now()).total_seconds())))
+            cache.set(cache_key(key), entry, timeout=timeout)
+        else:
+            token = Token(key=key, user=entry['user'], created=entry['created'])
+        
+        if is_expired(entry['created']):
+            Token.objects.filter(key=key).delete()
+            raise exceptions.AuthenticationFailed('Token has expired.')
+        return entry['user'], token
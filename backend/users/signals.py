@@ -0,0 +1,20 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from . import authentication
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    authentication.evict(instance.key)
+
+
+@receiver(post_save, sender=User)
+def evict_user_tokens(sender, instance, created, **kwargs):
+    # Cached entries hold a copy of the user; drop them so password, profile and
+    # is_active changes are seen by the next request
+    if not created:
+        for key in Token.objects.filter(user=instance).values_list('key', flat=True):
+            authentication.evict(key)
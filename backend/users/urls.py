@@ -1,7 +1,7 @@
 from django.urls import path
 from .views import (
     UserRegistrationView, UserProfileView, ChangePasswordView,
-    CustomAuthToken, login_view, logout_view
+    CustomAuthToken, login_view, logout_view, rotate_token_view
 )
 
 urlpatterns = [
@@ -11,4 +11,5 @@ urlpatterns = [
     path('login/', CustomAuthToken.as_view(), name='login'),
     path('login-alt/', login_view, name='login-alt'),
     path('logout/', logout_view, name='logout'),
+    path('token/rotate/', rotate_token_view, name='token-rotate'),
 ] 
\ No newline at end of file
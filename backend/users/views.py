@@ -3,9 +3,9 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.authtoken.views import ObtainAuthToken
-from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
+from .authentication import expires_at, issue_token, revoke_token, rotate_token
 from .serializers import UserRegistrationSerializer, UserProfileSerializer, ChangePasswordSerializer
 
 
@@ -42,21 +42,26 @@ class ChangePasswordView(generics.UpdateAPIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def token_data(token, user):
+    # user is passed in rather than read from token.user, which would query it again
+    return {
+        'token': token.key,
+        'expires_at': expires_at(token),
+        'user_id': user.pk,
+        'email': user.email,
+        'username': user.username,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+    }
+
+
 class CustomAuthToken(ObtainAuthToken):
     def post(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=request.data,
                                            context={'request': request})
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data['user']
-        token, created = Token.objects.get_or_create(user=user)
-        return Response({
-            'token': token.key,
-            'user_id': user.pk,
-            'email': user.email,
-            'username': user.username,
-            'first_name': user.first_name,
-            'last_name': user.last_name,
-        })
+        return Response(token_data(issue_token(user), user))
 
 
 @api_view(['POST'])
@@ -68,15 +73,7 @@ def login_view(request):
     if username and password:
         user = authenticate(username=username, password=password)
         if user:
-            token, created = Token.objects.get_or_create(user=user)
-            return Response({
-                'token': token.key,
-                'user_id': user.pk,
-                'email': user.email,
-                'username': user.username,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-            })
+            return Response(token_data(issue_token(user), user))
         else:
             return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
     else:
@@ -86,8 +83,15 @@ def login_view(request):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def logout_view(request):
-    try:
-        request.user.auth_token.delete()
+    # Deleting the token also evicts it from the authentication cache (users.signals)
+    if revoke_token(request.user):
         return Response({'message': 'Successfully logged out'}, status=status.HTTP_200_OK)
-    except:
-        return Response({'error': 'Error logging out'}, status=status.HTTP_400_BAD_REQUEST) 
\ No newline at end of file
+    return Response({'error': 'Error logging out'}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def rotate_token_view(request):
+    """Replace the caller's token with a new one; the old key stops working immediately."""
+    return Response(token_data(rotate_token(request.user), request.user))
+